@@ -0,0 +1,254 @@
+"""Per-student local cache of Canvas data.
+
+Courses, assignments, active enrollments (with grades) and announcements are
+kept in SQLite, keyed by Canvas user id and indexed by course, so tools answer
+from local queries. Each resource is re-synced once it is older than TTL:
+announcements incrementally, asking Canvas only for ones posted since the
+newest one stored (with the whole lookback window re-read every
+ANNOUNCEMENT_RESYNC seconds so edits and deletions show up), and assignments by refreshing the course's list but
+writing only rows whose updated_at changed (Canvas has no since filter for
+assignments). Syllabi change rarely, so they are re-synced after
+SYLLABUS_TTL, and parsed into sections once per content hash, shared by
+every student in the course. Concurrent tool calls needing the same sync
+share one fetch.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from canvas import syllabus
+from canvas.client import CanvasClient
+from telemetry import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+_root = Path(__file__).resolve().parent.parent
+DB_PATH = os.environ.get("CANVAS_CACHE_DB", str(_root / ".canvas_cache.db"))
+TTL_SECONDS = float(os.environ.get("CANVAS_CACHE_TTL", "300"))
+SYLLABUS_TTL = float(os.environ.get("CANVAS_SYLLABUS_TTL", "21600"))
+# How far back the first announcement sync looks
+ANNOUNCEMENT_LOOKBACK_DAYS = 120
+# Incremental syncs never see edited or deleted announcements; a full one does
+ANNOUNCEMENT_RESYNC = float(os.environ.get("CANVAS_ANNOUNCEMENT_RESYNC", "3600"))
+
+SYNCS = metrics.counter("buckeyebot_canvas_cache_total", "Canvas cache reads by resource and result", ("resource", "result"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    user_id INTEGER, id INTEGER, name TEXT, code TEXT, data TEXT,
+    PRIMARY KEY (user_id, id));
+CREATE INDEX IF NOT EXISTS courses_by_name ON courses (user_id, name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS assignments (
+    user_id INTEGER, course_id INTEGER, id INTEGER, ord INTEGER, due_at TEXT, updated_at TEXT, data TEXT,
+    PRIMARY KEY (user_id, id));
+CREATE INDEX IF NOT EXISTS assignments_by_course ON assignments (user_id, course_id, ord);
+CREATE INDEX IF NOT EXISTS assignments_by_due ON assignments (user_id, due_at);
+CREATE TABLE IF NOT EXISTS enrollments (
+    user_id INTEGER, course_id INTEGER, data TEXT,
+    PRIMARY KEY (user_id, course_id));
+CREATE TABLE IF NOT EXISTS announcements (
+    user_id INTEGER, course_id INTEGER, id INTEGER, posted_at TEXT, data TEXT,
+    PRIMARY KEY (user_id, id));
+CREATE INDEX IF NOT EXISTS announcements_by_course ON announcements (user_id, course_id, posted_at);
+CREATE TABLE IF NOT EXISTS syllabi (
+    user_id INTEGER, course_id INTEGER, hash TEXT,
+    PRIMARY KEY (user_id, course_id));
+CREATE TABLE IF NOT EXISTS syllabus_sections (
+    hash TEXT PRIMARY KEY, sections TEXT);
+CREATE TABLE IF NOT EXISTS synced (
+    user_id INTEGER, resource TEXT, scope TEXT, at REAL,
+    PRIMARY KEY (user_id, resource, scope));
+"""
+
+
+class CanvasCache:
+    def __init__(self, db_path: str = DB_PATH, ttl: float = TTL_SECONDS):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._syncing: dict[tuple, asyncio.Future] = {}
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    # -- Reads --
+
+    async def courses(self, canvas: CanvasClient) -> list[dict]:
+        user = await self._fresh(canvas, "courses", "", self._sync_courses)
+        return self._rows("SELECT data FROM courses WHERE user_id = ? ORDER BY name", (user,))
+
+    async def assignments(self, canvas: CanvasClient, course_id: int, limit: int = 20) -> list[dict]:
+        user = await self._fresh(canvas, "assignments", str(course_id), self._sync_assignments)
+        return self._rows(
+            "SELECT data FROM assignments WHERE user_id = ? AND course_id = ? ORDER BY ord LIMIT ?",
+            (user, course_id, limit),
+        )
+
+    async def enrollment(self, canvas: CanvasClient, course_id: int) -> dict | None:
+        user = await self._fresh(canvas, "enrollments", "", self._sync_enrollments)
+        rows = self._rows("SELECT data FROM enrollments WHERE user_id = ? AND course_id = ?", (user, course_id))
+        return rows[0] if rows else None
+
+    async def announcements(self, canvas: CanvasClient, course_id: int, limit: int = 10) -> list[dict]:
+        user = await self._fresh(canvas, "announcements", str(course_id), self._sync_announcements)
+        return self._rows(
+            "SELECT data FROM announcements WHERE user_id = ? AND course_id = ? ORDER BY posted_at DESC LIMIT ?",
+            (user, course_id, limit),
+        )
+
+    async def syllabus(self, canvas: CanvasClient, course_id: int) -> list[syllabus.Section]:
+        """The course syllabus split into sections; empty when the course has none."""
+        user = await self._fresh(canvas, "syllabus", str(course_id), self._sync_syllabus, SYLLABUS_TTL)
+        rows = self._rows(
+            "SELECT s.sections FROM syllabi y JOIN syllabus_sections s ON s.hash = y.hash"
+            " WHERE y.user_id = ? AND y.course_id = ?",
+            (user, course_id),
+        )
+        return [syllabus.Section(**sec) for sec in rows[0]] if rows else []
+
+    def _rows(self, sql: str, params: tuple) -> list[dict]:
+        with self._lock:
+            return [json.loads(data) for (data,) in self._db.execute(sql, params)]
+
+    # -- Freshness --
+
+    async def _fresh(self, canvas: CanvasClient, resource: str, scope: str, sync, ttl: float | None = None) -> int:
+        """Sync (resource, scope) for this student if it is older than the TTL. Returns the user id."""
+        user = await canvas.user_id()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT at FROM synced WHERE user_id = ? AND resource = ? AND scope = ?", (user, resource, scope)
+            ).fetchone()
+        if row and time.time() - row[0] < (ttl if ttl is not None else self._ttl):
+            # Counted rather than timed: a hit does no work worth a span
+            SYNCS.inc(resource=resource, result="hit")
+            return user
+
+        key = (user, resource, scope)
+        if key in self._syncing:
+            await asyncio.shield(self._syncing[key])
+            return user
+        SYNCS.inc(resource=resource, result="sync")
+        future = self._syncing[key] = asyncio.get_running_loop().create_future()
+        try:
+            with tracing.span("cache", f"canvas.{resource}") as span:
+                span.cache = "miss"
+                await sync(canvas, user, scope)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO synced (user_id, resource, scope, at) VALUES (?, ?, ?, ?)",
+                    (user, resource, scope, time.time()),
+                )
+            future.set_result(None)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters re-raise it themselves
+            raise
+        finally:
+            del self._syncing[key]
+        return user
+
+    # -- Syncs --
+
+    async def _sync_courses(self, canvas: CanvasClient, user: int, scope: str) -> None:
+        courses = await canvas.get_list("/users/self/courses", enrollment_state="active")
+        rows = [(user, c["id"], c.get("name", ""), c.get("course_code", ""), json.dumps(c)) for c in courses]
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM courses WHERE user_id = ?", (user,))
+            self._db.executemany("INSERT INTO courses VALUES (?, ?, ?, ?, ?)", rows)
+
+    async def _sync_assignments(self, canvas: CanvasClient, user: int, scope: str) -> None:
+        course_id = int(scope)
+        assignments = await canvas.get_list(f"/courses/{course_id}/assignments")
+        with self._lock:
+            stored = dict(
+                self._db.execute(
+                    "SELECT id, updated_at FROM assignments WHERE user_id = ? AND course_id = ?", (user, course_id)
+                ).fetchall()
+            )
+        changed = [
+            (user, course_id, a["id"], i, a.get("due_at"), a.get("updated_at"), json.dumps(a))
+            for i, a in enumerate(assignments)
+            if a["id"] not in stored or stored[a["id"]] != a.get("updated_at")
+        ]
+        reordered = [(i, user, a["id"]) for i, a in enumerate(assignments) if a["id"] in stored]
+        removed = [(user, i) for i in stored.keys() - {a["id"] for a in assignments}]
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR REPLACE INTO assignments VALUES (?, ?, ?, ?, ?, ?, ?)", changed)
+            self._db.executemany("UPDATE assignments SET ord = ? WHERE user_id = ? AND id = ?", reordered)
+            self._db.executemany("DELETE FROM assignments WHERE user_id = ? AND id = ?", removed)
+
+    async def _sync_enrollments(self, canvas: CanvasClient, user: int, scope: str) -> None:
+        # One call for every active course, instead of walking all past enrollments per question
+        enrollments = await canvas.get_list("/users/self/enrollments", **{"state[]": ["active"]})
+        rows = [(user, e["course_id"], json.dumps(e)) for e in enrollments if e.get("course_id")]
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM enrollments WHERE user_id = ?", (user,))
+            self._db.executemany("INSERT OR REPLACE INTO enrollments VALUES (?, ?, ?)", rows)
+
+    async def _sync_announcements(self, canvas: CanvasClient, user: int, scope: str) -> None:
+        course_id = int(scope)
+        with self._lock:
+            (newest,) = self._db.execute(
+                "SELECT MAX(posted_at) FROM announcements WHERE user_id = ? AND course_id = ?", (user, course_id)
+            ).fetchone()
+            full = self._db.execute(
+                "SELECT at FROM synced WHERE user_id = ? AND resource = 'announcements_full' AND scope = ?", (user, scope)
+            ).fetchone()
+        now = datetime.now(timezone.utc)
+        complete = newest is None or full is None or now.timestamp() - full[0] >= ANNOUNCEMENT_RESYNC
+        since = (now - timedelta(days=ANNOUNCEMENT_LOOKBACK_DAYS)).isoformat() if complete else newest
+        # Without end_date Canvas stops at start_date + 28 days, missing anything newer
+        announcements = await canvas.get_list(
+            "/announcements",
+            **{"context_codes[]": [f"course_{course_id}"], "start_date": since, "end_date": now.isoformat()},
+        )
+        rows = [(user, course_id, a["id"], a.get("posted_at") or "", json.dumps(a)) for a in announcements]
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            if complete:
+                # Whatever the full window no longer returns was deleted (or aged out)
+                self._db.execute("DELETE FROM announcements WHERE user_id = ? AND course_id = ?", (user, course_id))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO synced (user_id, resource, scope, at) VALUES (?, 'announcements_full', ?, ?)",
+                    (user, scope, now.timestamp()),
+                )
+            self._db.executemany("INSERT OR REPLACE INTO announcements VALUES (?, ?, ?, ?, ?)", rows)
+
+    async def _sync_syllabus(self, canvas: CanvasClient, user: int, scope: str) -> None:
+        course_id = int(scope)
+        course = await canvas.get(f"/courses/{course_id}", **{"include[]": ["syllabus_body"]})
+        html = course.get("syllabus_body") or ""
+        digest = hashlib.sha256(html.encode()).hexdigest()
+        with self._lock:
+            parsed = self._db.execute("SELECT 1 FROM syllabus_sections WHERE hash = ?", (digest,)).fetchone()
+        if not parsed:
+            sections = await asyncio.to_thread(syllabus.parse, html)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO syllabus_sections VALUES (?, ?)",
+                    (digest, json.dumps([dataclasses.asdict(s) for s in sections])),
+                )
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO syllabi VALUES (?, ?, ?)", (user, course_id, digest))
+
+
+_cache: CanvasCache | None = None
+
+
+def get_cache() -> CanvasCache:
+    global _cache
+    if _cache is None:
+        _cache = CanvasCache()
+    return _cache
@@ -0,0 +1,147 @@
+"""Async client for the Canvas LMS REST API (Carmen).
+
+Replaces the synchronous canvasapi SDK, whose requests blocked the event loop
+for every student. Lists are paginated by following the Link header with
+per_page=100, and callers can stop early with `limit` so a tool that shows
+the first 20 items fetches one page instead of all of them.
+
+Canvas throttles per token, reporting what is left of the token's request
+budget in X-Rate-Limit-Remaining and answering 403 "Rate Limit Exceeded" once
+it runs out. Each client adapts its own concurrency to that header (halving
+when the budget runs low, growing by one while it is healthy) and retries
+throttled requests with jittered backoff.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator
+from urllib.parse import urlsplit
+
+import httpx
+
+from messaging.resilience import full_jitter
+from telemetry import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+_TIMEOUT = 20.0
+_MAX_RETRIES = 3
+
+MAX_CONCURRENCY = int(os.environ.get("CANVAS_MAX_CONCURRENCY", "8"))
+# X-Rate-Limit-Remaining thresholds (Canvas buckets start at 700)
+BUDGET_LOW = 150.0
+BUDGET_HIGH = 400.0
+
+THROTTLED = metrics.counter("buckeyebot_canvas_throttled_total", "Canvas requests answered with a rate-limit 403")
+
+
+class AdaptiveLimit:
+    """Concurrency limit that shrinks and grows with the token's remaining rate-limit budget."""
+
+    def __init__(self, initial: int = 4, maximum: int = MAX_CONCURRENCY):
+        self.limit = min(initial, maximum)
+        self.maximum = maximum
+        self._in_flight = 0
+        self._changed = asyncio.Condition()
+
+    async def __aenter__(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._changed:
+            self._in_flight -= 1
+            self._changed.notify_all()
+
+    def feedback(self, remaining: float | None) -> None:
+        if remaining is None:
+            return
+        if remaining < BUDGET_LOW:
+            self.limit = max(1, self.limit // 2)
+        elif remaining > BUDGET_HIGH and self.limit < self.maximum:
+            self.limit += 1
+
+    def throttled(self) -> None:
+        self.limit = 1
+
+
+class CanvasClient:
+    def __init__(self, base_url: str, token: str):
+        self.base_url = base_url.rstrip("/")
+        self._http = httpx.AsyncClient(
+            base_url=f"{self.base_url}/api/v1",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=_TIMEOUT,
+        )
+        self._user_id: int | None = None
+        self.limit = AdaptiveLimit()
+
+    async def _get(self, url: str, params: dict | None = None) -> httpx.Response:
+        for attempt in range(_MAX_RETRIES + 1):
+            async with self.limit:
+                with tracing.span("http", "canvas" + tracing.route_name(urlsplit(url).path)) as span:
+                    resp = await self._http.get(url, params=params)
+                    span.bytes = len(resp.content)
+            self.limit.feedback(_remaining(resp))
+            if not _is_throttled(resp) or attempt == _MAX_RETRIES:
+                break
+            THROTTLED.inc()
+            self.limit.throttled()
+            delay = full_jitter(attempt, base=1.0)
+            logger.info("Canvas throttled %s, retrying in %.1fs", urlsplit(url).path, delay)
+            await asyncio.sleep(delay)
+        resp.raise_for_status()
+        return resp
+
+    async def user_id(self) -> int:
+        """Canvas id of the token's user, fetched once."""
+        if self._user_id is None:
+            self._user_id = (await self.get("/users/self"))["id"]
+        return self._user_id
+
+    async def get(self, path: str, **params) -> dict:
+        """GET a single object, e.g. get("/courses/123", **{"include[]": ["syllabus_body"]})."""
+        return (await self._get(path, params)).json()
+
+    async def paginate(self, path: str, limit: int | None = None, **params) -> AsyncIterator[dict]:
+        """Yield items from a list endpoint page by page, stopping after `limit` items."""
+        url: str | None = path
+        page_params: dict | None = {"per_page": min(limit, PER_PAGE) if limit else PER_PAGE, **params}
+        count = 0
+        while url:
+            resp = await self._get(url, page_params)
+            for item in resp.json():
+                yield item
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+            # The next link already carries every query parameter
+            url = resp.links.get("next", {}).get("url")
+            page_params = None
+
+    async def get_list(self, path: str, limit: int | None = None, **params) -> list[dict]:
+        return [item async for item in self.paginate(path, limit, **params)]
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+
+def _remaining(resp: httpx.Response) -> float | None:
+    try:
+        return float(resp.headers["X-Rate-Limit-Remaining"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _is_throttled(resp: httpx.Response) -> bool:
+    return resp.status_code == 403 and "rate limit exceeded" in resp.text.lower()
+
+
+def from_env() -> CanvasClient:
+    return CanvasClient(
+        os.environ.get("CANVAS_API_URL", "https://osu.instructure.com"),
+        os.environ["CANVAS_API_TOKEN"],
+    )
@@ -0,0 +1,123 @@
+"""Resolve what a student calls a course to the Canvas course.
+
+Canvas course tools accept an id, a course code ("CSE 2421", "cse2421"), the
+course name or the student's Canvas nickname for it ("systems"), so the agent
+can pass the student's words straight through instead of listing courses
+first. The index is built from the student's locally cached course list, so
+resolving costs no Canvas round-trip once courses are synced.
+
+Matching is fuzzy: subject codes and numbers are compared token by token,
+words may be abbreviated ("calc" for "Calculus"), and small typos are
+tolerated. When two courses match about equally well the caller gets both
+back and asks the student which one they meant.
+"""
+
+import re
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from canvas.cache import get_cache
+from canvas.client import CanvasClient
+
+# Below this score nothing matches; the best match must beat the runner-up by MARGIN
+MIN_SCORE = 0.6
+MARGIN = 0.15
+WORDS_WEIGHT = 0.8
+
+_TERM = re.compile(r"\b(?:su|sp|au|fa|wi)\d{2}\b|\b(?:spring|summer|autumn|fall|winter)\s*\d{4}\b")
+
+
+def _tokens(text: str) -> list[str]:
+    """Lowercase words with letters and digits split apart: "CSE2421" -> ["cse", "2421"]."""
+    return re.findall(r"[a-z]+|\d+", _TERM.sub(" ", text.lower()))
+
+
+@dataclass
+class CourseEntry:
+    course: dict
+    aliases: list[list[str]] = field(default_factory=list)
+    # (subject, number) pairs such as ("cse", "2421") found in the code or name
+    codes: set[tuple[str, str]] = field(default_factory=set)
+
+    @property
+    def id(self) -> int:
+        return self.course["id"]
+
+    @property
+    def name(self) -> str:
+        return self.course.get("name", "Unknown")
+
+
+class CourseIndex:
+    def __init__(self, courses: list[dict]):
+        self.entries = []
+        for c in courses:
+            # With a nickname set, Canvas returns it as `name` and keeps the real one in `original_name`
+            texts = [t for t in (c.get("name"), c.get("original_name"), c.get("course_code")) if t]
+            aliases = [_tokens(t) for t in texts]
+            codes = {(a[i], a[i + 1]) for a in aliases for i in range(len(a) - 1) if a[i].isalpha() and a[i + 1].isdigit()}
+            self.entries.append(CourseEntry(c, [a for a in aliases if a], codes))
+
+    def match(self, text: str) -> list[CourseEntry]:
+        """Courses that match `text`, best first: one entry when unambiguous, several when not, none when nothing fits."""
+        text = text.strip()
+        if text.isdigit():
+            for e in self.entries:
+                if e.id == int(text):
+                    return [e]
+
+        query = _tokens(text)
+        if not query:
+            return []
+        scored = sorted(((_score(query, e), e) for e in self.entries), key=lambda s: s[0], reverse=True)
+        scored = [(s, e) for s, e in scored if s >= MIN_SCORE]
+        if len(scored) > 1 and scored[0][0] - scored[1][0] >= MARGIN:
+            return [scored[0][1]]
+        best = scored[0][0] if scored else 0
+        return [e for s, e in scored if best - s < MARGIN]
+
+
+def _score(query: list[str], entry: CourseEntry) -> float:
+    codes = {(query[i], query[i + 1]) for i in range(len(query) - 1) if query[i].isalpha() and query[i + 1].isdigit()}
+    if codes & entry.codes:
+        return 1.0
+    # A bare number is close to a code; with another subject in front ("ece 2421") it is a different course
+    subjects = {num: subject for subject, num in codes}
+    if any(n == num and subjects.get(n, subject) == subject for n in query if n.isdigit() for subject, num in entry.codes):
+        return 0.9
+    if query in entry.aliases:
+        return 1.0
+    # Matching some words of a longer name is weaker evidence than a code or a whole nickname
+    return WORDS_WEIGHT * max((_words_score(query, alias) for alias in entry.aliases), default=0.0)
+
+
+def _words_score(query: list[str], alias: list[str]) -> float:
+    """Average over query words of how well each matches some word of the alias."""
+    total = 0.0
+    for q in query:
+        best = 0.0
+        for w in alias:
+            if q == w:
+                best = 1.0
+                break
+            if q.isdigit():
+                continue
+            if len(q) >= 3 and w.startswith(q):
+                best = max(best, 0.9)
+            elif len(q) >= 4:
+                best = max(best, SequenceMatcher(None, q, w).ratio())
+        total += best
+    return total / len(query)
+
+
+async def resolve(canvas: CanvasClient, text: str) -> tuple[dict | None, str]:
+    """The course `text` refers to, or None and a message for the agent explaining why not."""
+    index = CourseIndex(await get_cache().courses(canvas))
+    matches = index.match(str(text))
+    if len(matches) == 1:
+        return matches[0].course, ""
+    if matches:
+        options = "; ".join(f"{e.name} [ID: {e.id}]" for e in matches[:5])
+        return None, f'"{text}" matches more than one course: {options}. Ask the student which one they mean.'
+    known = "; ".join(f"{e.name} [ID: {e.id}]" for e in index.entries) or "none"
+    return None, f'No current course matches "{text}". The student\'s courses are: {known}.'
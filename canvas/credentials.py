@@ -0,0 +1,96 @@
+"""Per-student Canvas access tokens, encrypted at rest.
+
+Tokens are stored in SQLite keyed by phone number and encrypted with Fernet
+using CANVAS_CREDENTIALS_KEY (generate one with
+`python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"`).
+Encryption needs the optional cryptography package; without it, or without a
+key, the store refuses to save tokens rather than writing them in the clear.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # optional: pip install cryptography
+    Fernet = None
+
+logger = logging.getLogger(__name__)
+
+_root = Path(__file__).resolve().parent.parent
+DB_PATH = os.environ.get("CANVAS_CREDENTIALS_DB", str(_root / ".canvas_credentials.db"))
+KEY = os.environ.get("CANVAS_CREDENTIALS_KEY", "")
+
+# Canvas access tokens are "<account id>~<64 letters and digits>"
+TOKEN_PATTERN = re.compile(r"\b\d+~[A-Za-z0-9]{32,}\b")
+
+
+class CredentialsUnavailable(Exception):
+    pass
+
+
+def enabled() -> bool:
+    """Whether per-student tokens can be stored (a key is set and cryptography is installed)."""
+    return bool(KEY) and Fernet is not None
+
+
+def find_token(text: str) -> str | None:
+    """The first Canvas access token in `text`, if any."""
+    match = TOKEN_PATTERN.search(text or "")
+    return match.group() if match else None
+
+
+def redact(text: str, placeholder: str = "[Canvas access token]") -> str:
+    return TOKEN_PATTERN.sub(placeholder, text or "")
+
+
+class CredentialStore:
+    def __init__(self, db_path: str = DB_PATH, key: str = KEY):
+        self._fernet = Fernet(key) if key and Fernet is not None else None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS credentials (phone TEXT PRIMARY KEY, token BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def set_token(self, phone: str, token: str) -> None:
+        if self._fernet is None:
+            raise CredentialsUnavailable("Canvas credential storage is not configured")
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO credentials (phone, token, updated) VALUES (?, ?, ?)",
+                (phone, self._fernet.encrypt(token.encode()), time.time()),
+            )
+
+    def get_token(self, phone: str) -> str | None:
+        if self._fernet is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT token FROM credentials WHERE phone = ?", (phone,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return self._fernet.decrypt(row[0]).decode()
+        except InvalidToken:
+            logger.warning("Stored Canvas token for %s cannot be decrypted with the current key", phone[-4:])
+            return None
+
+    def delete(self, phone: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM credentials WHERE phone = ?", (phone,))
+
+
+_store: CredentialStore | None = None
+
+
+def get_store() -> CredentialStore:
+    global _store
+    if _store is None:
+        _store = CredentialStore()
+    return _store
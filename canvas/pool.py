@@ -0,0 +1,105 @@
+"""Pool of per-student Canvas clients.
+
+Each student who has connected their own Canvas token gets a CanvasClient
+that is reused across turns, so its HTTP connections stay open and its
+adaptive rate limit keeps tracking that token's budget. The pool is an LRU
+capped at POOL_SIZE; evicted clients are closed.
+
+Without CANVAS_CREDENTIALS_KEY the bot runs single-tenant: every student is
+served from the shared CANVAS_API_TOKEN client, as before.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+
+import httpx
+
+from canvas import credentials
+from canvas.client import CanvasClient, from_env
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.environ.get("CANVAS_POOL_SIZE", "64"))
+BASE_URL = os.environ.get("CANVAS_API_URL", "https://osu.instructure.com")
+
+POOLED = metrics.gauge("buckeyebot_canvas_clients", "Per-student Canvas clients held open")
+
+
+class CanvasNotConnected(Exception):
+    pass
+
+
+class ClientPool:
+    def __init__(self, size: int = POOL_SIZE):
+        self._size = size
+        self._clients: OrderedDict[str, CanvasClient] = OrderedDict()
+        self._shared: CanvasClient | None = None
+        # Pending close() calls; the loop only keeps weak references to tasks
+        self._closing: set[asyncio.Task] = set()
+
+    def client(self, phone: str) -> CanvasClient:
+        """The Canvas client for this student, creating it on first use."""
+        if not credentials.enabled():
+            if self._shared is None:
+                self._shared = from_env()
+            return self._shared
+
+        if phone in self._clients:
+            self._clients.move_to_end(phone)
+            return self._clients[phone]
+        token = credentials.get_store().get_token(phone) if phone else None
+        if token is None:
+            raise CanvasNotConnected(
+                "This student has not connected Canvas yet. Ask them to create an access token in "
+                "Carmen (Account > Settings > New Access Token) and text it here; it is saved "
+                "automatically."
+            )
+        client = self._clients[phone] = CanvasClient(BASE_URL, token)
+        POOLED.inc()
+        while len(self._clients) > self._size:
+            _, evicted = self._clients.popitem(last=False)
+            self._close(evicted)
+        return client
+
+    def forget(self, phone: str) -> None:
+        """Drop the student's client, e.g. after their token changes."""
+        client = self._clients.pop(phone, None)
+        if client is not None:
+            self._close(client)
+
+    def _close(self, client: CanvasClient) -> None:
+        POOLED.dec()
+        task = asyncio.create_task(client.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+
+async def connect(phone: str, token: str) -> str:
+    """Check a student's token against Canvas and save it. Returns a message for the student."""
+    if not credentials.enabled():
+        return "Canvas accounts are configured by the operator here; no token is needed."
+    client = CanvasClient(BASE_URL, token.strip())
+    try:
+        await client.user_id()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 401:
+            return "Canvas rejected that token. Double-check it was copied in full."
+        raise
+    finally:
+        await client.close()
+    credentials.get_store().set_token(phone, token.strip())
+    get_pool().forget(phone)
+    return "Canvas connected. I can now look up your courses, assignments and grades."
+
+
+_pool: ClientPool | None = None
+
+
+def get_pool() -> ClientPool:
+    global _pool
+    if _pool is None:
+        _pool = ClientPool()
+    return _pool
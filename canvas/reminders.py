@@ -0,0 +1,339 @@
+"""Deadline reminders for opted-in students.
+
+Each subscriber's upcoming Canvas work is refreshed with one planner query
+across all their courses every REFRESH_SECONDS, and a reminder row is kept
+per (item, lead time) in SQLite, so pending reminders and what was already
+sent survive restarts. Reminders and the next refresh of every subscriber
+sit in one in-memory heap ordered by fire time; a single task sleeps until
+the earliest entry, so tens of thousands of reminders cost one timer.
+
+Entries are never removed from the heap in place: when a due date moves or
+an item is submitted the row changes, and a popped entry that no longer
+matches its row is discarded. Reminders that come due together for one
+student go out as a single text.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from canvas import credentials
+from canvas.pool import get_pool
+from messaging.sender import send_message
+from telemetry import metrics
+from tools.utils import EASTERN
+
+logger = logging.getLogger(__name__)
+
+_root = Path(__file__).resolve().parent.parent
+DB_PATH = os.environ.get("REMINDER_DB", str(_root / ".reminders.db"))
+LEAD_HOURS = [float(h) for h in os.environ.get("REMINDER_LEAD_HOURS", "24,2").split(",")]
+REFRESH_SECONDS = float(os.environ.get("REMINDER_REFRESH_SECONDS", "3600"))
+# A reminder whose text failed to send is tried again this much later, until its item is due
+RETRY_SECONDS = float(os.environ.get("REMINDER_RETRY_SECONDS", "300"))
+REFRESH_CONCURRENCY = int(os.environ.get("REMINDER_REFRESH_CONCURRENCY", "4"))
+# Planner item types that have a due date worth reminding about
+_DUE_TYPES = {"assignment", "quiz", "discussion_topic"}
+
+SENT = metrics.counter("buckeyebot_reminders_sent_total", "Deadline reminders sent")
+REFRESHES = metrics.counter("buckeyebot_reminder_refreshes_total", "Reminder refreshes from Canvas by result", ("result",))
+SCHEDULED = metrics.gauge("buckeyebot_reminders_scheduled", "Entries in the reminder timer heap")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    phone TEXT PRIMARY KEY, leads TEXT NOT NULL, refreshed REAL NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS reminders (
+    phone TEXT, item TEXT, lead REAL, fire_at REAL, due_at TEXT, course TEXT, title TEXT, sent INTEGER DEFAULT 0,
+    PRIMARY KEY (phone, item, lead));
+CREATE INDEX IF NOT EXISTS reminders_pending ON reminders (sent, fire_at);
+"""
+
+
+@dataclass
+class Reminder:
+    phone: str
+    item: str
+    lead: float
+    fire_at: float
+    due_at: str
+    course: str
+    title: str
+
+
+class ReminderStore:
+    def __init__(self, db_path: str = DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def subscribe(self, phone: str, leads: list[float]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO subscribers (phone, leads) VALUES (?, ?) ON CONFLICT(phone) DO UPDATE SET leads = excluded.leads",
+                (phone, json.dumps(leads)),
+            )
+
+    def unsubscribe(self, phone: str) -> bool:
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM reminders WHERE phone = ?", (phone,))
+            return self._db.execute("DELETE FROM subscribers WHERE phone = ?", (phone,)).rowcount > 0
+
+    def leads(self, phone: str) -> list[float] | None:
+        """The student's lead times in hours, or None if they are not subscribed."""
+        with self._lock:
+            row = self._db.execute("SELECT leads FROM subscribers WHERE phone = ?", (phone,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def subscribers(self) -> dict[str, tuple[list[float], float]]:
+        """phone -> (lead hours, last refresh time)"""
+        with self._lock:
+            rows = self._db.execute("SELECT phone, leads, refreshed FROM subscribers").fetchall()
+        return {phone: (json.loads(leads), refreshed) for phone, leads, refreshed in rows}
+
+    def replace(self, phone: str, reminders: list[Reminder], now: float) -> list[Reminder]:
+        """Make `reminders` the student's schedule; returns the rows that are new or moved.
+
+        Reminders already sent stay sent unless their due date moved. Unsent
+        reminders missing from the list (submitted, deleted) are dropped.
+        """
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            if not self._db.execute("UPDATE subscribers SET refreshed = ? WHERE phone = ?", (now, phone)).rowcount:
+                return []  # opted out while the refresh was running
+            # Compared by due date: a failed send's retry moves fire_at but not the deadline
+            stored = {
+                (item, lead): (due_at, sent)
+                for item, lead, due_at, sent in self._db.execute(
+                    "SELECT item, lead, due_at, sent FROM reminders WHERE phone = ?", (phone,)
+                )
+            }
+            wanted = {(r.item, r.lead): r for r in reminders}
+            changed = []
+            for key, r in wanted.items():
+                old = stored.get(key)
+                if old is not None and _parse(old[0]) == _parse(r.due_at):
+                    continue
+                if old is None and r.fire_at < now:
+                    continue  # subscribed after this lead time had passed
+                self._db.execute(
+                    "INSERT OR REPLACE INTO reminders VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (phone, r.item, r.lead, r.fire_at, r.due_at, r.course, r.title),
+                )
+                changed.append(r)
+            gone = [(phone, item, lead) for (item, lead), (_, sent) in stored.items() if (item, lead) not in wanted and not sent]
+            self._db.executemany("DELETE FROM reminders WHERE phone = ? AND item = ? AND lead = ?", gone)
+            # Sent rows are only needed until their item is due
+            self._db.execute(
+                "DELETE FROM reminders WHERE phone = ? AND sent = 1 AND due_at < ?",
+                (phone, _iso(now)),
+            )
+        return changed
+
+    def pending(self) -> list[Reminder]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT phone, item, lead, fire_at, due_at, course, title FROM reminders WHERE sent = 0"
+            ).fetchall()
+        return [Reminder(*row) for row in rows]
+
+    def take(self, phone: str, item: str, lead: float, fire_at: float) -> Reminder | None:
+        """Mark the reminder sent if it is still scheduled for fire_at; returns it, or None if stale."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT phone, item, lead, fire_at, due_at, course, title FROM reminders"
+                " WHERE phone = ? AND item = ? AND lead = ? AND fire_at = ? AND sent = 0",
+                (phone, item, lead, fire_at),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE reminders SET sent = 1 WHERE phone = ? AND item = ? AND lead = ?", (phone, item, lead))
+        return Reminder(*row)
+
+    def retry(self, reminders: list[Reminder], at: float) -> list[Reminder]:
+        """Mark taken reminders unsent again, now scheduled for `at`; returns those still unchanged since taken."""
+        retried = []
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            for r in reminders:
+                # A refresh that moved the due date meanwhile has already rescheduled the row
+                if self._db.execute(
+                    "UPDATE reminders SET sent = 0, fire_at = ? WHERE phone = ? AND item = ? AND lead = ? AND fire_at = ? AND sent = 1",
+                    (at, r.phone, r.item, r.lead, r.fire_at),
+                ).rowcount:
+                    retried.append(r)
+        return retried
+
+
+class ReminderScheduler:
+    def __init__(self, store: ReminderStore | None = None):
+        self.store = store or ReminderStore()
+        # (time, seq, phone, item, lead); item is "" for a refresh of that student
+        self._heap: list[tuple[float, int, str, str, float]] = []
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._limit = asyncio.Semaphore(REFRESH_CONCURRENCY)
+        self._task: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        # A refresh entry is live only if it matches the student's next refresh time
+        self._next_refresh: dict[str, float] = {}
+
+    async def start(self) -> None:
+        now = time.time()
+        for r in self.store.pending():
+            self._push(r.fire_at, r.phone, r.item, r.lead)
+        for phone, (_, refreshed) in self.store.subscribers().items():
+            # Spread restart refreshes out instead of querying Canvas for everyone at once
+            self._schedule_refresh(phone, max(refreshed + REFRESH_SECONDS, now + random.uniform(0, 60)))
+        self._task = asyncio.create_task(self._run())
+        logger.info("Reminder scheduler started with %d entries", len(self._heap))
+
+    async def stop(self) -> None:
+        for task in (self._task, *self._tasks):
+            if task is not None:
+                task.cancel()
+
+    def subscribe(self, phone: str, leads: list[float]) -> None:
+        self.store.subscribe(phone, leads)
+        self._schedule_refresh(phone, time.time())
+
+    def unsubscribe(self, phone: str) -> bool:
+        # Heap entries left behind no longer match a row and are discarded when popped
+        self._next_refresh.pop(phone, None)
+        return self.store.unsubscribe(phone)
+
+    def _schedule_refresh(self, phone: str, at: float) -> None:
+        self._next_refresh[phone] = at
+        self._push(at, phone)
+
+    def _push(self, at: float, phone: str, item: str = "", lead: float = 0.0) -> None:
+        heapq.heappush(self._heap, (at, next(self._seq), phone, item, lead))
+        SCHEDULED.set(len(self._heap))
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due: dict[str, list[Reminder]] = {}
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                at, _, phone, item, lead = heapq.heappop(self._heap)
+                if not item:
+                    if self._next_refresh.get(phone) != at:
+                        continue
+                    self._spawn(self._refresh(phone))
+                    continue
+                reminder = self.store.take(phone, item, lead, at)
+                if reminder is not None and _parse(reminder.due_at) > now:
+                    due.setdefault(phone, []).append(reminder)
+            SCHEDULED.set(len(self._heap))
+            for phone, reminders in due.items():
+                self._spawn(self._send(phone, reminders))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, phone: str) -> None:
+        if not credentials.enabled():
+            return  # the shared token's planner is its owner's, not this student's
+        leads = self.store.leads(phone)
+        if leads is None:
+            return  # opted out since this refresh was scheduled
+        now = time.time()
+        try:
+            async with self._limit:
+                canvas = get_pool().client(phone)
+                horizon = max(leads) * 3600 + 2 * REFRESH_SECONDS
+                items = await canvas.get_list(
+                    "/planner/items",
+                    start_date=_iso(now),
+                    end_date=_iso(now + horizon),
+                )
+            reminders = [r for item in items for r in _reminders(phone, item, leads)]
+            for r in self.store.replace(phone, reminders, now):
+                self._push(r.fire_at, phone, r.item, r.lead)
+            REFRESHES.inc(result="ok")
+        except Exception:
+            REFRESHES.inc(result="error")
+            logger.warning("Reminder refresh failed for %s", phone[-4:], exc_info=True)
+        finally:
+            if self._next_refresh.get(phone, float("inf")) <= now:
+                self._schedule_refresh(phone, now + REFRESH_SECONDS)
+
+    async def _send(self, phone: str, reminders: list[Reminder]) -> None:
+        reminders.sort(key=lambda r: r.due_at)
+        lines = [f"- {r.title} ({r.course}) due {_when(r.due_at)}" for r in reminders]
+        text = "Reminder: " + lines[0][2:] if len(lines) == 1 else "Coming up:\n" + "\n".join(lines)
+        try:
+            await send_message(phone, text)
+            SENT.inc(len(reminders))
+        except Exception:
+            logger.warning("Failed to send %d reminders to %s", len(reminders), phone[-4:], exc_info=True)
+            at = time.time() + RETRY_SECONDS
+            for r in self.store.retry(reminders, at):
+                self._push(at, phone, r.item, r.lead)
+
+
+def _reminders(phone: str, item: dict, leads: list[float]) -> list[Reminder]:
+    if item.get("plannable_type") not in _DUE_TYPES:
+        return []
+    submissions = item.get("submissions") or {}
+    if submissions.get("submitted") or submissions.get("excused"):
+        return []
+    plannable = item.get("plannable") or {}
+    due_at = plannable.get("due_at") or item.get("plannable_date")
+    if not due_at:
+        return []
+    due = _parse(due_at)
+    key = f"{item['plannable_type']}:{item.get('plannable_id')}"
+    title = plannable.get("title") or plannable.get("name") or "Assignment"
+    return [
+        Reminder(phone, key, lead, due - lead * 3600, due_at, item.get("context_name", ""), title)
+        for lead in leads
+    ]
+
+
+def _parse(iso: str) -> float:
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _when(iso: str) -> str:
+    return datetime.fromtimestamp(_parse(iso), EASTERN).strftime("%a %b %d at %I:%M %p ET")
+
+
+_scheduler: ReminderScheduler | None = None
+
+
+def get_reminders() -> ReminderScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ReminderScheduler()
+    return _scheduler
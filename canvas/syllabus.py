@@ -0,0 +1,165 @@
+"""Syllabus text extraction and section selection.
+
+A course's syllabus_body HTML is converted to text once per version (the
+parsed sections are cached by content hash in the Canvas cache) and split
+into sections at headings, including the bold one-line paragraphs many
+Canvas syllabi use as headings. Each section is classified as grading,
+schedule, policies, office hours or other, so a question about office hours
+gets the office hours section instead of the first 1400 characters.
+"""
+
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+MAX_CHARS = 1400
+# A bold-only block this short reads as a heading
+_HEADING_CHARS = 80
+
+KINDS = {
+    "grading": ("grade", "grading", "points", "percent", "weight", "curve", "rubric", "exam", "midterm", "final", "quiz", "score"),
+    "schedule": ("schedule", "calendar", "week", "due", "date", "deadline", "topics", "lecture", "reading", "module"),
+    "policies": ("policy", "policies", "late", "attendance", "absence", "makeup", "integrity", "misconduct", "disability", "accommodation", "extension"),
+    "office_hours": ("office", "hours", "contact", "email", "instructor", "professor", "ta", "teaching", "zoom", "appointment"),
+}
+
+# Ignored when matching question words against section text
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "for", "in", "on", "to", "is", "it", "my", "me", "i", "you", "can", "do", "does",
+    "what", "when", "where", "how", "please", "send", "show", "give", "get", "find", "tell", "see", "about",
+    "syllabus", "class", "course",
+}
+
+_BLOCKS = {"p", "div", "br", "li", "tr", "table", "ul", "ol", "section", "h1", "h2", "h3", "h4", "h5", "h6"}
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_BOLD = {"strong", "b"}
+_SKIP = {"script", "style"}
+
+
+@dataclass
+class Section:
+    kind: str
+    heading: str
+    text: str
+
+
+class _TextParser(HTMLParser):
+    """Collects (text, is_heading) blocks from syllabus HTML."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: list[tuple[str, bool]] = []
+        self._parts: list[str] = []
+        self._bold_chars = 0
+        self._bold_depth = 0
+        self._heading = False
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP:
+            self._skip += 1
+        elif tag in _BLOCKS:
+            self._flush()
+            self._heading = tag in _HEADINGS
+            if tag == "li":
+                self._parts.append("- ")
+        elif tag in _BOLD:
+            self._bold_depth += 1
+        elif tag in ("td", "th") and self._parts:
+            self._parts.append(" | ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCKS:
+            self._flush()
+        elif tag in _BOLD:
+            self._bold_depth = max(0, self._bold_depth - 1)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        self._parts.append(data)
+        if self._bold_depth:
+            self._bold_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        text = re.sub(r"\s+", " ", "".join(self._parts)).strip(" |")
+        if text and text != "-":
+            bold_heading = self._bold_chars >= len(text.replace(" ", "")) * 0.9 and len(text) <= _HEADING_CHARS
+            self.blocks.append((text, self._heading or bold_heading))
+        self._parts, self._bold_chars, self._heading = [], 0, False
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"[a-z]+", text.lower()))
+
+
+def _hits(words: set[str], keys: tuple[str, ...]) -> int:
+    """How many words match a keyword, counting inflections of longer ones ("graded", "exams")."""
+    return sum(1 for w in words if any(w == k or (len(k) >= 4 and w.startswith(k)) for k in keys))
+
+
+def classify(heading: str, text: str) -> str:
+    """The kind of a section, judged by its heading first and its body second."""
+    for words in (_words(heading), _words(text)):
+        hits = {kind: _hits(words, keys) for kind, keys in KINDS.items()}
+        kind, count = max(hits.items(), key=lambda h: h[1])
+        if count:
+            return kind
+    return "other"
+
+
+def parse(html: str) -> list[Section]:
+    parser = _TextParser()
+    parser.feed(html)
+    parser.close()
+
+    sections: list[Section] = []
+    heading, lines = "", []
+    for text, is_heading in parser.blocks:
+        if is_heading:
+            if lines or heading:
+                sections.append(Section(classify(heading, " ".join(lines)), heading, "\n".join(lines)))
+            heading, lines = text, []
+        else:
+            lines.append(text)
+    if lines or heading:
+        sections.append(Section(classify(heading, " ".join(lines)), heading, "\n".join(lines)))
+    return sections
+
+
+def select(sections: list[Section], question: str, max_chars: int = MAX_CHARS, course: str = "") -> str:
+    """The sections that answer `question`, within max_chars, plus a list of the other headings.
+
+    Words of `course` (its name and code) are not topic words: they name the syllabus, not a section of it.
+    """
+    asked = _words(question) - _STOPWORDS - _words(course)
+    kinds = {kind for kind, keys in KINDS.items() if _hits(asked, keys)}
+    # Sections that mention the question's words, unless only the untitled preamble does
+    mentioned = [s for s in sections if asked & _words(f"{s.heading} {s.text}")]
+    if not any(s.heading for s in mentioned):
+        mentioned = []
+    # Sections of the kind asked about; else the mentioning ones; else the start
+    chosen = [s for s in sections if s.kind in kinds] or mentioned or sections
+
+    out, shown, used = [], set(), 0
+    for sec in chosen:
+        block = f"## {sec.heading}\n{sec.text}" if sec.heading else sec.text
+        if used + len(block) > max_chars:
+            if not out:
+                out.append(block[:max_chars] + "... (truncated)")
+                shown.add(id(sec))
+                used = max_chars
+            continue
+        out.append(block)
+        shown.add(id(sec))
+        used += len(block) + 2
+    rest = [sec.heading for sec in sections if id(sec) not in shown and sec.heading]
+    if rest:
+        out.append("Other sections: " + "; ".join(rest))
+    return "\n\n".join(out)
@@ -1,34 +1,39 @@
+import asyncio
+import heapq
+import itertools
 import os
 from datetime import datetime
 
 from beeai_framework.tools import StringToolOutput, tool
 
-from canvasapi import Canvas
+from canvas import credentials, syllabus
+from canvas.cache import get_cache
+from canvas.client import CanvasClient
+from canvas.courses import resolve
+from canvas.pool import get_pool
+from canvas.reminders import LEAD_HOURS, get_reminders
+from tools.compress import current_question
+from tools.context import current_student
 
-_canvas: Canvas | None = None
+# Courses fetched at once by get_upcoming_assignments
+FANOUT = int(os.environ.get("CANVAS_FANOUT", "6"))
+UPCOMING_SHOWN = 15
 
 
-def _get_canvas() -> Canvas:
-    global _canvas
-    if _canvas is None:
-        api_url = os.environ.get("CANVAS_API_URL", "https://osu.instructure.com")
-        api_token = os.environ["CANVAS_API_TOKEN"]
-        _canvas = Canvas(api_url, api_token)
-    return _canvas
+def _get_canvas() -> CanvasClient:
+    return get_pool().client(current_student())
 
 
 @tool
 async def get_canvas_courses() -> StringToolOutput:
     """Get all current Canvas (Carmen) courses for the student."""
-    canvas = _get_canvas()
-    user = canvas.get_current_user()
-    courses = user.get_courses(enrollment_state="active")
+    courses = await get_cache().courses(_get_canvas())
     result = []
     for c in courses:
         result.append({
-            "id": c.id,
-            "name": getattr(c, "name", "Unknown"),
-            "code": getattr(c, "course_code", ""),
+            "id": c["id"],
+            "name": c.get("name", "Unknown"),
+            "code": c.get("course_code", ""),
         })
     return StringToolOutput(f"Your courses:\n" + "\n".join(
         f"- {c['name']} ({c['code']}) [ID: {c['id']}]" for c in result
@@ -36,121 +41,159 @@ async def get_canvas_courses() -> StringToolOutput:
 
 
 @tool
-async def get_course_assignments(course_id: int) -> StringToolOutput:
-    """Get all assignments for a Canvas course. Use get_canvas_courses first to find course IDs."""
+async def get_course_assignments(course: str) -> StringToolOutput:
+    """Get all assignments for a Canvas course. `course` is a course name, code (e.g. "CSE 2421") or ID."""
     canvas = _get_canvas()
-    course = canvas.get_course(course_id)
-    assignments = course.get_assignments()
+    c, problem = await resolve(canvas, course)
+    if c is None:
+        return StringToolOutput(problem)
+    assignments = await get_cache().assignments(canvas, c["id"], limit=20)
     result = []
     for a in assignments:
         result.append({
-            "name": a.name,
-            "due": str(getattr(a, "due_at", "No due date")),
-            "points": getattr(a, "points_possible", "N/A"),
-            "submitted": getattr(a, "has_submitted_submissions", False),
+            "name": a["name"],
+            "due": str(a.get("due_at") or "No due date"),
+            "points": a.get("points_possible", "N/A"),
+            "submitted": a.get("has_submitted_submissions", False),
         })
     lines = []
     for a in result[:20]:
         status = "submitted" if a["submitted"] else "pending"
         lines.append(f"- {a['name']} | Due: {a['due']} | Points: {a['points']} | {status}")
-    return StringToolOutput(f"Assignments for course {course_id}:\n" + "\n".join(lines) if lines else "No assignments found.")
+    return StringToolOutput(f"Assignments for {c['name']}:\n" + "\n".join(lines) if lines else "No assignments found.")
 
 
 @tool
 async def get_upcoming_assignments() -> StringToolOutput:
     """Get upcoming assignments across all Canvas courses, sorted by due date."""
     canvas = _get_canvas()
-    user = canvas.get_current_user()
-    courses = user.get_courses(enrollment_state="active")
-    upcoming = []
+    courses = await canvas.get_list("/users/self/courses", enrollment_state="active")
     now = datetime.utcnow().isoformat() + "Z"
-    for course in courses:
+    limit = asyncio.Semaphore(FANOUT)
+    per_course = await asyncio.gather(*(_upcoming_for_course(canvas, c, now, limit) for c in courses))
+    # Each course's list is already sorted by due date
+    upcoming = itertools.islice(heapq.merge(*per_course, key=lambda x: x["due"]), UPCOMING_SHOWN)
+    lines = []
+    for a in upcoming:
+        lines.append(f"- [{a['course']}] {a['name']} | Due: {a['due']} | {a['points']} pts")
+    return StringToolOutput("Upcoming assignments:\n" + "\n".join(lines) if lines else "No upcoming assignments found.")
+
+
+async def _upcoming_for_course(canvas: CanvasClient, course: dict, now: str, limit: asyncio.Semaphore) -> list[dict]:
+    """A course's next UPCOMING_SHOWN assignments by due date; later ones can never make the list."""
+    upcoming = []
+    async with limit:
         try:
-            assignments = course.get_assignments(
+            assignments = await canvas.get_list(
+                f"/courses/{course['id']}/assignments",
+                limit=UPCOMING_SHOWN,
                 order_by="due_at",
                 bucket="upcoming",
             )
             for a in assignments:
-                due = getattr(a, "due_at", None)
+                due = a.get("due_at")
                 if due and due >= now:
                     upcoming.append({
-                        "course": getattr(course, "name", "Unknown"),
-                        "name": a.name,
+                        "course": course.get("name", "Unknown"),
+                        "name": a.get("name", "Assignment"),
                         "due": due,
-                        "points": getattr(a, "points_possible", "N/A"),
+                        "points": a.get("points_possible", "N/A"),
                     })
         except Exception:
-            continue
+            return []
     upcoming.sort(key=lambda x: x["due"])
-    lines = []
-    for a in upcoming[:15]:
-        lines.append(f"- [{a['course']}] {a['name']} | Due: {a['due']} | {a['points']} pts")
-    return StringToolOutput("Upcoming assignments:\n" + "\n".join(lines) if lines else "No upcoming assignments found.")
+    return upcoming
 
 
 @tool
-async def get_course_grades(course_id: int) -> StringToolOutput:
-    """Get the student's grades/enrollments for a specific Canvas course."""
+async def get_course_grades(course: str) -> StringToolOutput:
+    """Get the student's grades/enrollments for a specific Canvas course. `course` is a course name, code or ID."""
     canvas = _get_canvas()
-    user = canvas.get_current_user()
-    enrollments = user.get_enrollments()
-    for e in enrollments:
-        if getattr(e, "course_id", None) == course_id:
-            grades = getattr(e, "grades", {})
-            current = grades.get("current_score", "N/A")
-            final = grades.get("final_score", "N/A")
-            letter = grades.get("current_grade", "N/A")
-            course_name = getattr(e, "course_name", f"Course {course_id}")
-            return StringToolOutput(
-                f"Grades for {course_name}:\n"
-                f"- Current Score: {current}%\n"
-                f"- Final Score: {final}%\n"
-                f"- Letter Grade: {letter}"
-            )
-    return StringToolOutput(f"No grade data found for course {course_id}.")
+    c, problem = await resolve(canvas, course)
+    if c is None:
+        return StringToolOutput(problem)
+    e = await get_cache().enrollment(canvas, c["id"])
+    if e is not None:
+        grades = e.get("grades") or {}
+        current = grades.get("current_score", "N/A")
+        final = grades.get("final_score", "N/A")
+        letter = grades.get("current_grade", "N/A")
+        return StringToolOutput(
+            f"Grades for {c['name']}:\n"
+            f"- Current Score: {current}%\n"
+            f"- Final Score: {final}%\n"
+            f"- Letter Grade: {letter}"
+        )
+    return StringToolOutput(f"No grade data found for {c['name']}.")
 
 
 @tool
-async def get_course_announcements(course_id: int) -> StringToolOutput:
-    """Get recent announcements for a Canvas course."""
+async def get_course_announcements(course: str) -> StringToolOutput:
+    """Get recent announcements for a Canvas course. `course` is a course name, code or ID."""
     canvas = _get_canvas()
-    course = canvas.get_course(course_id)
-    announcements = course.get_discussion_topics(only_announcements=True)
+    c, problem = await resolve(canvas, course)
+    if c is None:
+        return StringToolOutput(problem)
+    announcements = await get_cache().announcements(canvas, c["id"], limit=10)
     lines = []
-    for a in list(announcements)[:10]:
-        title = getattr(a, "title", "Untitled")
-        posted = getattr(a, "posted_at", "Unknown date")
+    for a in announcements:
+        title = a.get("title", "Untitled")
+        posted = a.get("posted_at") or "Unknown date"
         lines.append(f"- {title} (posted {posted})")
-    return StringToolOutput(f"Announcements for course {course_id}:\n" + "\n".join(lines) if lines else "No announcements found.")
+    return StringToolOutput(f"Announcements for {c['name']}:\n" + "\n".join(lines) if lines else "No announcements found.")
 
 
 @tool
 async def get_canvas_todos() -> StringToolOutput:
     """Get the student's Canvas to-do items (ungraded submissions, upcoming items)."""
-    canvas = _get_canvas()
-    user = canvas.get_current_user()
-    todos = user.get_todo_items() if hasattr(user, "get_todo_items") else []
+    todos = await _get_canvas().get_list("/users/self/todo")
     lines = []
     for t in todos:
-        assignment = getattr(t, "assignment", {})
-        name = assignment.get("name", "Unknown") if isinstance(assignment, dict) else getattr(assignment, "name", "Unknown")
-        course = getattr(t, "course_id", "")
+        name = (t.get("assignment") or {}).get("name", "Unknown")
+        course = t.get("course_id", "")
         lines.append(f"- {name} (Course: {course})")
     return StringToolOutput("To-do items:\n" + "\n".join(lines) if lines else "No to-do items.")
 
 
 @tool
-async def get_course_syllabus(course_id: int) -> StringToolOutput:
-    """Get the syllabus for a Canvas course."""
+async def get_course_syllabus(course: str, topic: str = "") -> StringToolOutput:
+    """Get the syllabus for a Canvas course. `course` is a course name, code or ID. Only the sections about `topic` (e.g. "grading", "office hours", "late work") are returned; it defaults to the student's question."""
     canvas = _get_canvas()
-    course = canvas.get_course(course_id, include=["syllabus_body"])
-    syllabus = getattr(course, "syllabus_body", None)
-    if syllabus:
-        # Strip HTML tags for SMS readability
-        import re
-        text = re.sub(r"<[^>]+>", " ", syllabus)
-        text = re.sub(r"\s+", " ", text).strip()
-        if len(text) > 1400:
-            text = text[:1400] + "... (truncated)"
-        return StringToolOutput(f"Syllabus for course {course_id}:\n{text}")
-    return StringToolOutput(f"No syllabus found for course {course_id}.")
+    c, problem = await resolve(canvas, course)
+    if c is None:
+        return StringToolOutput(problem)
+    sections = await get_cache().syllabus(canvas, c["id"])
+    if not sections:
+        return StringToolOutput(f"No syllabus found for {c['name']}.")
+    names = f"{course} {c.get('name', '')} {c.get('course_code', '')}"
+    return StringToolOutput(
+        f"Syllabus for {c['name']}:\n" + syllabus.select(sections, topic or current_question(), course=names)
+    )
+
+
+@tool
+async def enable_deadline_reminders(hours_before: str = "") -> StringToolOutput:
+    """Text the student before their Canvas assignments are due. `hours_before` is a comma-separated list of how many hours ahead to remind (default "24,2")."""
+    try:
+        leads = sorted({float(h) for h in hours_before.split(",") if h.strip()}, reverse=True) or LEAD_HOURS
+    except ValueError:
+        return StringToolOutput(f'Could not read "{hours_before}" as hours; use numbers like "24,2".')
+    if any(h <= 0 or h > 168 for h in leads):
+        return StringToolOutput("Reminder times must be between 0 and 168 hours before the deadline.")
+    if not credentials.enabled():
+        # One shared token would remind every student of its owner's assignments
+        return StringToolOutput("Deadline reminders need each student's own Canvas account, which isn't set up here.")
+    phone = current_student()
+    _get_canvas()  # fails with a clear message if the student has not connected Canvas
+    get_reminders().subscribe(phone, leads)
+    return StringToolOutput(
+        "Deadline reminders on: you'll get a text " + " and ".join(f"{h:g}h" for h in leads) + " before each assignment is due."
+    )
+
+
+@tool
+async def disable_deadline_reminders() -> StringToolOutput:
+    """Stop sending the student deadline reminder texts."""
+    if get_reminders().unsubscribe(current_student()):
+        return StringToolOutput("Deadline reminders are off.")
+    return StringToolOutput("Deadline reminders were not on.")
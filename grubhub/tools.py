@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 
@@ -5,15 +6,53 @@ from beeai_framework.tools import StringToolOutput, tool
 
 logger = logging.getLogger(__name__)
 
+# Appium calls and the automation's sleeps block, so each tool's driver session
+# runs in a worker thread instead of on the shared event loop.
+
+
+def _search(query: str) -> list[dict]:
+    from grubhub.automation import get_driver, search_restaurants
+    driver = get_driver()
+    try:
+        return search_restaurants(driver, query)
+    finally:
+        driver.quit()
+
+
+def _menu(restaurant_name: str) -> list[dict]:
+    from grubhub.automation import get_driver, search_restaurants, get_menu
+    driver = get_driver()
+    try:
+        search_restaurants(driver, restaurant_name)
+        return get_menu(driver, restaurant_index=0)
+    finally:
+        driver.quit()
+
+
+def _order(restaurant_name: str, item_list: list[str]) -> tuple[list[str], list[str], str]:
+    from grubhub.automation import get_driver, search_restaurants, get_menu, add_to_cart, checkout
+    driver = get_driver()
+    try:
+        search_restaurants(driver, restaurant_name)
+        get_menu(driver, restaurant_index=0)
+
+        added = []
+        failed = []
+        for item_name in item_list:
+            if add_to_cart(driver, item_name):
+                added.append(item_name)
+            else:
+                failed.append(item_name)
+        return added, failed, checkout(driver)
+    finally:
+        driver.quit()
+
 
 @tool
 async def search_grubhub_restaurants(query: str) -> StringToolOutput:
     """Search for restaurants on Grubhub. Requires Android emulator running with Grubhub installed."""
     try:
-        from grubhub.automation import get_driver, search_restaurants
-        driver = get_driver()
-        results = search_restaurants(driver, query)
-        driver.quit()
+        results = await asyncio.to_thread(_search, query)
         if results:
             lines = [f"- {r['name']}" for r in results]
             return StringToolOutput(f"Grubhub restaurants for '{query}':\n" + "\n".join(lines))
@@ -30,11 +69,7 @@ async def search_grubhub_restaurants(query: str) -> StringToolOutput:
 async def get_restaurant_menu(restaurant_name: str) -> StringToolOutput:
     """Get the menu for a Grubhub restaurant. Search for the restaurant first."""
     try:
-        from grubhub.automation import get_driver, search_restaurants, get_menu
-        driver = get_driver()
-        search_restaurants(driver, restaurant_name)
-        menu = get_menu(driver, restaurant_index=0)
-        driver.quit()
+        menu = await asyncio.to_thread(_menu, restaurant_name)
         if menu:
             lines = [f"- {item['name']}" for item in menu]
             return StringToolOutput(f"Menu for '{restaurant_name}':\n" + "\n".join(lines))
@@ -53,22 +88,8 @@ async def place_grubhub_order(restaurant_name: str, items: str) -> StringToolOut
         items: Comma-separated list of menu item names to add to cart.
     """
     try:
-        from grubhub.automation import get_driver, search_restaurants, get_menu, add_to_cart, checkout
-        driver = get_driver()
-        search_restaurants(driver, restaurant_name)
-        get_menu(driver, restaurant_index=0)
-
         item_list = [i.strip() for i in items.split(",")]
-        added = []
-        failed = []
-        for item_name in item_list:
-            if add_to_cart(driver, item_name):
-                added.append(item_name)
-            else:
-                failed.append(item_name)
-
-        result = checkout(driver)
-        driver.quit()
+        added, failed, result = await asyncio.to_thread(_order, restaurant_name, item_list)
 
         msg = f"Order from {restaurant_name}:\n"
         if added:
@@ -0,0 +1,136 @@
+"""Webhook load generator.
+
+Starts the fake Linq API, replays signed webhook deliveries at a target rate
+against a running bot, and reports sustained throughput and reply latency.
+
+    python -m loadtest.bot &                 # bot on :5000 using the fake Linq
+    python -m loadtest --rate 20 --duration 60
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+import uvicorn
+
+from loadtest import payloads
+from loadtest.fake_linq import FakeLinq, Recorder
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class LoadGenerator:
+    def __init__(self, args: argparse.Namespace, recorder: Recorder):
+        self.args = args
+        self.recorder = recorder
+        self.statuses: dict[int | str, int] = {}
+        self.sent = 0
+        self._http = httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=200))
+
+    async def run(self) -> None:
+        """Open-loop: deliveries are scheduled on the clock whether or not earlier ones have returned."""
+        interval = 1 / self.args.rate
+        started = time.monotonic()
+        tasks = []
+        while time.monotonic() - started < self.args.duration:
+            tasks.append(asyncio.create_task(self._deliver_one()))
+            self.sent += 1
+            await asyncio.sleep(max(0.0, started + self.sent * interval - time.monotonic()))
+        await asyncio.gather(*tasks)
+        await self._http.aclose()
+
+    async def _deliver_one(self) -> None:
+        student = random.randrange(self.args.students)
+        if random.random() < self.args.noise:
+            payload = payloads.typing(student, started=random.random() < 0.5)
+        else:
+            payload = payloads.message_received(student, self.args.from_number, service=self.args.service)
+        body, headers = payloads.sign(payload, self.args.secret)
+        is_message = payload["event_type"] == "message.received"
+        if is_message:
+            sent = self.recorder.inbound(payloads.chat_id(student))
+        try:
+            resp = await self._http.post(self.args.target, content=body, headers=headers)
+            status: int | str = resp.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if is_message and status != 200:
+            # Rejected deliveries will never be answered
+            self.recorder.rejected(payloads.chat_id(student), sent)
+
+
+def report(gen: LoadGenerator, recorder: Recorder, elapsed: float) -> str:
+    """Summary of one run; `elapsed` is the generation phase only, not the drain."""
+    lat = recorder.latencies
+    replies = recorder.replies
+    window = (replies[-1] - replies[0]) if len(replies) > 1 else 0.0
+    lines = [
+        f"deliveries sent      {gen.sent} in {elapsed:.1f}s ({gen.sent / elapsed:.1f}/s)",
+        "responses            " + ", ".join(f"{k}: {v}" for k, v in sorted(gen.statuses.items(), key=str)),
+        f"replies received     {len(replies)}"
+        + (f" (sustained {len(replies) / window:.1f} msgs/s)" if window else ""),
+        f"messages answered    {len(lat)}, unanswered {recorder.unanswered()}",
+        "reply latency        "
+        + " ".join(f"p{p}={percentile(lat, p):.2f}s" for p in (50, 90, 95, 99))
+        + (f" max={max(lat):.2f}s" if lat else ""),
+        f"linq 429s injected   {recorder.throttled}",
+        "linq requests        " + ", ".join(f"{k}: {v}" for k, v in sorted(recorder.requests.items())),
+    ]
+    return "\n".join(lines)
+
+
+async def main(args: argparse.Namespace) -> None:
+    recorder = Recorder()
+    fake = FakeLinq(
+        recorder,
+        latency=args.linq_latency,
+        throttle_rate=args.linq_429,
+        deliver_to=args.target if args.deliver else "",
+        secret=args.secret,
+    )
+    server = uvicorn.Server(uvicorn.Config(fake.app, host="127.0.0.1", port=args.linq_port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    gen = LoadGenerator(args, recorder)
+    started = time.monotonic()
+    await gen.run()
+    elapsed = time.monotonic() - started
+    # Give in-flight turns time to reply
+    deadline = time.monotonic() + args.drain
+    while recorder.unanswered() and time.monotonic() < deadline:
+        await asyncio.sleep(0.25)
+    print(report(gen, recorder, elapsed))
+
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="http://127.0.0.1:5000/webhook")
+    parser.add_argument("--secret", default="loadtest", help="LINQ_WEBHOOK_SECRET the bot was started with")
+    parser.add_argument("--rate", type=float, default=10, help="webhook deliveries per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to generate load")
+    parser.add_argument("--students", type=int, default=100, help="distinct phone numbers")
+    parser.add_argument("--noise", type=float, default=0.1, help="fraction of deliveries that are typing events")
+    parser.add_argument("--service", default="iMessage", help="service on inbound messages (SMS exercises segmentation)")
+    parser.add_argument("--from-number", default="+15550000000")
+    parser.add_argument("--drain", type=float, default=30, help="seconds to wait for outstanding replies")
+    parser.add_argument("--linq-port", type=int, default=8099)
+    parser.add_argument("--linq-latency", type=float, default=0.05, help="mean fake Linq response time")
+    parser.add_argument("--linq-429", type=float, default=0.0, help="fraction of Linq calls answered with 429")
+    parser.add_argument("--deliver", action="store_true", help="post message.delivered webhooks back to the bot")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s: %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,44 @@
+"""Run BuckeyeBot against the fake Linq API with the mock LLM.
+
+    python -m loadtest.bot [--llm-latency 0.5] [--linq-url http://127.0.0.1:8099]
+
+Set BUCKEYEBOT_LLM instead of using the mock to load-test a real model.
+"""
+
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linq-url", default="http://127.0.0.1:8099")
+    parser.add_argument("--secret", default="loadtest")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mean mock model think time (seconds)")
+    parser.add_argument("--real-llm", action="store_true", help="use BUCKEYEBOT_LLM instead of the mock")
+    args = parser.parse_args()
+
+    # Must be set before the messaging modules are imported
+    os.environ["LINQ_API_URL"] = args.linq_url
+    os.environ["LINQ_WEBHOOK_SECRET"] = args.secret
+    os.environ.setdefault("LINQ_API_TOKEN", "loadtest")
+    os.environ.setdefault("LINQ_FROM_NUMBER", "+15550000000")
+    # Local state stays apart from the real bot's, so a real start never resumes fake turns or texts +1555 numbers
+    os.environ["LINQ_CHAT_DB"] = ".loadtest_chats.db"
+    os.environ["WEBHOOK_JOURNAL_DB"] = ".loadtest_journal.db"
+    os.environ["REMINDER_DB"] = ".loadtest_reminders.db"
+    os.environ["CANVAS_CACHE_DB"] = ".loadtest_canvas_cache.db"
+    os.environ["CANVAS_CREDENTIALS_DB"] = ".loadtest_credentials.db"
+    os.environ["ATTACHMENT_DIR"] = ".loadtest_attachments"
+
+    import main as buckeyebot
+
+    llm = None
+    if not args.real_llm:
+        from loadtest.mock_llm import MockChatModel
+
+        llm = MockChatModel(latency=args.llm_latency)
+    buckeyebot.main(llm)
+
+
+if __name__ == "__main__":
+    main()
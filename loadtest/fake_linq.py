@@ -0,0 +1,129 @@
+"""Local stand-in for the Linq Partner API v3.
+
+Implements the endpoints messaging/client.py calls (chats, messages, typing,
+read receipts, reactions) with configurable latency and 429 injection, and
+records when replies reach each chat so the load generator can time them.
+Optionally posts signed message.delivered webhooks back to the bot.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import Counter, defaultdict, deque
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from loadtest import payloads
+
+logger = logging.getLogger(__name__)
+
+
+class Recorder:
+    """Matches replies to the inbound messages they answer, per chat."""
+
+    def __init__(self):
+        self.pending: dict[str, deque[float]] = defaultdict(deque)  # chat id -> inbound send times
+        self.latencies: list[float] = []
+        self.replies: list[float] = []  # reply arrival times
+        self.requests: Counter[str] = Counter()
+        self.throttled = 0
+
+    def inbound(self, chat: str) -> float:
+        sent = time.monotonic()
+        self.pending[chat].append(sent)
+        return sent
+
+    def rejected(self, chat: str, sent: float) -> None:
+        """Forget an inbound message the bot refused; a reply may already have answered it."""
+        try:
+            self.pending[chat].remove(sent)
+        except ValueError:
+            pass
+
+    def reply(self, chat: str) -> None:
+        now = time.monotonic()
+        self.replies.append(now)
+        # Coalesced bursts are answered by one reply, so it answers everything pending
+        waiting = self.pending.get(chat)
+        while waiting:
+            self.latencies.append(now - waiting.popleft())
+
+    def unanswered(self) -> int:
+        return sum(len(q) for q in self.pending.values())
+
+
+class FakeLinq:
+    def __init__(
+        self,
+        recorder: Recorder,
+        latency: float = 0.05,
+        throttle_rate: float = 0.0,
+        deliver_to: str = "",
+        delivery_delay: float = 1.0,
+        secret: str = "",
+    ):
+        self.recorder = recorder
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.deliver_to = deliver_to
+        self.delivery_delay = delivery_delay
+        self.secret = secret
+        self._ids = itertools.count(1)
+        self._http: httpx.AsyncClient | None = None
+        self.app = Starlette(
+            routes=[
+                Route("/chats", self.create_chat, methods=["POST"]),
+                Route("/chats/{chat_id}/messages", self.send_message, methods=["POST"]),
+                Route("/chats/{chat_id}/typing", self.ok, methods=["POST", "DELETE"]),
+                Route("/chats/{chat_id}/read", self.ok, methods=["POST"]),
+                Route("/messages/{message_id}/reactions", self.ok, methods=["POST"]),
+            ]
+        )
+
+    async def _simulate(self, request: Request) -> JSONResponse | None:
+        """Apply latency and maybe a 429. Returns the throttle response, or None to proceed."""
+        endpoint = request.scope["route"].path
+        self.recorder.requests[f"{request.method} {endpoint}"] += 1
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            self.recorder.throttled += 1
+            return JSONResponse({"error": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
+        return None
+
+    async def create_chat(self, request: Request) -> JSONResponse:
+        if throttled := await self._simulate(request):
+            return throttled
+        body = await request.json()
+        return JSONResponse({"chat": {"id": f"fake-chat-{body['to'][0]}"}})
+
+    async def send_message(self, request: Request) -> JSONResponse:
+        if throttled := await self._simulate(request):
+            return throttled
+        chat = request.path_params["chat_id"]
+        body = await request.json()
+        message_id = f"fake-out-{next(self._ids)}"
+        self.recorder.reply(chat)
+        if self.deliver_to:
+            asyncio.create_task(self._deliver(message_id, chat, body.get("service", "")))
+        return JSONResponse({"message": {"id": message_id, "service": body.get("service", "")}})
+
+    async def ok(self, request: Request) -> JSONResponse:
+        if throttled := await self._simulate(request):
+            return throttled
+        return JSONResponse({})
+
+    async def _deliver(self, message_id: str, chat: str, service: str) -> None:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.delivery_delay)
+        body, headers = payloads.sign(payloads.message_status(message_id, chat, "delivered", service), self.secret)
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=10)
+        try:
+            await self._http.post(self.deliver_to, content=body, headers=headers)
+        except httpx.HTTPError:
+            logger.debug("Delivery webhook for %s failed", message_id)
@@ -0,0 +1,46 @@
+"""ChatModel that answers immediately with a final_answer tool call.
+
+Lets the full agent pipeline (memory, RequirementAgent, tool events, telemetry)
+run under load without calling watsonx. `latency` simulates model think time.
+"""
+
+import asyncio
+import json
+import random
+import uuid
+from collections.abc import AsyncGenerator
+
+from beeai_framework.backend import AssistantMessage, ChatModel, ChatModelOutput
+from beeai_framework.backend.message import MessageToolCallContent
+from beeai_framework.backend.types import ChatModelInput, ChatModelUsage
+from beeai_framework.context import RunContext
+
+
+class MockChatModel(ChatModel):
+    def __init__(self, latency: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    @property
+    def model_id(self) -> str:
+        return "mock"
+
+    @property
+    def provider_id(self) -> str:
+        return "beeai"
+
+    async def _create(self, input: ChatModelInput, run: RunContext) -> ChatModelOutput:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        question = input.messages[-1].text if input.messages else ""
+        answer = f"(load test) You asked: {question[:200]}"
+        call = MessageToolCallContent(
+            id=f"call_{uuid.uuid4().hex[:12]}", tool_name="final_answer", args=json.dumps({"response": answer})
+        )
+        return ChatModelOutput(
+            output=[AssistantMessage(call)],
+            usage=ChatModelUsage(prompt_tokens=len(question) // 4, completion_tokens=len(answer) // 4),
+            finish_reason="tool_calls",
+        )
+
+    async def _create_stream(self, input: ChatModelInput, run: RunContext) -> AsyncGenerator[ChatModelOutput]:
+        yield await self._create(input, run)
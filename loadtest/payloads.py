@@ -0,0 +1,70 @@
+"""Linq webhook payloads for load tests, signed the way verify_webhook_signature expects."""
+
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+QUESTIONS = [
+    "what's open for dinner near the union?",
+    "when is my next CSE 2221 assignment due",
+    "is the CABS east residential bus running",
+    "any events on the oval today?",
+    "what's my grade in math 1151",
+    "find me a study room in thompson library tonight",
+    "when does the RPAC close",
+    "where can I park near the stadium for the game",
+]
+
+_ids = itertools.count(1)
+
+
+def student_number(i: int) -> str:
+    return f"+1555{i:07d}"
+
+
+def chat_id(i: int) -> str:
+    return f"loadtest-chat-{i}"
+
+
+def message_received(student: int, to_number: str, text: str | None = None, service: str = "iMessage") -> dict:
+    return {
+        "event_type": "message.received",
+        "data": {
+            "id": f"loadtest-in-{next(_ids)}",
+            "chat": {"id": chat_id(student), "owner_handle": {"handle": to_number}},
+            "sender_handle": {"handle": student_number(student)},
+            "parts": [{"type": "text", "value": text or random.choice(QUESTIONS)}],
+            "service": service,
+            "sent_at": datetime.now(timezone.utc).isoformat(),
+        },
+    }
+
+
+def message_status(message_id: str, chat: str, status: str = "delivered", service: str = "") -> dict:
+    data = {"id": message_id, "chat": {"id": chat}}
+    if service:
+        data["service"] = service
+    return {"event_type": f"message.{status}", "data": data}
+
+
+def typing(student: int, started: bool = True) -> dict:
+    return {
+        "event_type": f"chat.typing_indicator.{'started' if started else 'stopped'}",
+        "data": {"chat": {"id": chat_id(student)}, "sender_handle": {"handle": student_number(student)}},
+    }
+
+
+def sign(payload: dict, secret: str) -> tuple[str, dict]:
+    """Serialize a payload and return (body, headers) with a Linq HMAC-SHA256 signature."""
+    body = json.dumps(payload)
+    timestamp = str(int(time.time()))
+    signature = hmac.new(secret.encode(), f"{timestamp}.{body}".encode(), hashlib.sha256).hexdigest()
+    return body, {
+        "Content-Type": "application/json",
+        "X-Webhook-Signature": f"sha256={signature}",
+        "X-Webhook-Timestamp": timestamp,
+    }
@@ -14,19 +14,30 @@ logging.basicConfig(
 logger = logging.getLogger("buckeyebot")
 
 
-def main():
-    from agent import create_agent
+def main(llm=None):
+    from agent import NESTED, create_agent, tool_event
     from messaging.webhook import app, set_agent_handler
     from messaging import chat_store
+    from telemetry import tracing
+    from telemetry.hooks import instrument
+    from tools.compress import set_question
+    from tools.context import set_student
 
     chat_store.load()
 
-    agent = create_agent()
+    agent = create_agent(llm)
     logger.info("BuckeyeBot agent initialized")
 
-    async def handle_message(text: str, from_number: str) -> str:
+    async def handle_message(text: str, from_number: str, progress) -> str:
         try:
-            response = await agent.run(text)
+            set_question(text)
+            set_student(from_number)
+            with tracing.span("agent", "run"):
+                response = await instrument(
+                    agent.run(text)
+                    .on(tool_event("start"), lambda _, event: progress.tool_started(event.creator.name), NESTED)
+                    .on(tool_event("success"), lambda _, event: progress.tool_finished(event.creator.name), NESTED)
+                )
             return response.last_message.text
         except Exception as e:
             logger.exception("Agent error")
@@ -38,7 +49,28 @@ def main():
     logger.info("Starting BuckeyeBot on port %d", port)
     logger.info("Configure your Linq webhook to POST to: http://<your-host>:%d/webhook", port)
 
-    app.run(host="0.0.0.0", port=port, debug=False)
+    # "asgi" serves everything from one event loop; "flask" is the compatibility mode
+    if os.environ.get("SERVER_MODE", "asgi") == "flask":
+        import signal
+
+        from canvas.reminders import get_reminders
+        from messaging.webhook import get_dispatcher, resume_journal
+
+        dispatcher = get_dispatcher()
+        dispatcher.start_in_thread()
+        asyncio.run_coroutine_threadsafe(resume_journal(), dispatcher.loop)
+        asyncio.run_coroutine_threadsafe(get_reminders().start(), dispatcher.loop)
+        # Turn SIGTERM into a normal exit so in-flight turns get to drain
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            app.run(host="0.0.0.0", port=port, debug=False)
+        finally:
+            dispatcher.drain_threadsafe()
+    else:
+        import uvicorn
+        from messaging.asgi import app as asgi_app
+
+        uvicorn.run(asgi_app, host="0.0.0.0", port=port)
 
 
 if __name__ == "__main__":
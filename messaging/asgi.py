@@ -0,0 +1,64 @@
+"""ASGI webhook entry point.
+
+Runs on one long-lived event loop: deliveries are verified, parsed and put on
+the dispatcher's bounded queue, and a saturated queue answers 503 with
+Retry-After so Linq backs off and redelivers. Shutdown drains the queue with
+a deadline; startup resumes messages left unanswered in the journal.
+
+    uvicorn messaging.asgi:app --port 5000
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from canvas.reminders import get_reminders
+from messaging.webhook import admit, get_dispatcher, parse_request, resume_journal
+from telemetry import metrics
+
+
+async def linq_webhook(request: Request) -> Response:
+    # GET = health check
+    if request.method == "GET":
+        return PlainTextResponse("OK")
+
+    try:
+        raw_body = (await request.body()).decode()
+    except UnicodeDecodeError:
+        return JSONResponse({"error": "Body is not valid UTF-8"}, status_code=400)
+    event, error = parse_request(raw_body, request.headers)
+    if error:
+        body, status = error
+        return JSONResponse(body, status_code=status)
+
+    body, status, headers = admit(event, get_dispatcher().submit)
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    dispatcher = get_dispatcher()
+    await dispatcher.start()
+    resuming = asyncio.create_task(resume_journal())
+    await get_reminders().start()
+    yield
+    resuming.cancel()
+    await get_reminders().stop()
+    await dispatcher.drain()
+
+
+app = Starlette(
+    routes=[
+        Route("/webhook", linq_webhook, methods=["GET", "POST"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,258 @@
+"""Inbound attachment ingestion.
+
+Media parts of an inbound message are streamed from their Linq URLs to disk in
+chunks, hashing as they go, and stored under their sha256 so a syllabus sent
+twice (or by two students) is stored and text-extracted once. Downloads
+start as soon as the webhook is processed, in the background and concurrently,
+and the reply path waits at most MAX_WAIT seconds for them. Text is extracted
+from plain text and PDFs (PDFs need the optional pypdf package) and appended
+to the agent's input. Images are described by name and size only.
+
+The cache directory is swept after each new download: files unused for
+CACHE_MAX_AGE are removed, then the least recently used until it is under
+CACHE_MAX_BYTES. Cache hits refresh a file's mtime.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+from telemetry import metrics, tracing
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional: pip install pypdf
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+_root = Path(__file__).resolve().parent.parent
+CACHE_DIR = Path(os.environ.get("ATTACHMENT_DIR", _root / ".attachments"))
+MAX_BYTES = int(os.environ.get("ATTACHMENT_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_WAIT = float(os.environ.get("ATTACHMENT_MAX_WAIT", "5"))
+MAX_CHARS = int(os.environ.get("ATTACHMENT_MAX_CHARS", "4000"))
+CONCURRENCY = int(os.environ.get("ATTACHMENT_CONCURRENCY", "4"))
+CACHE_MAX_BYTES = int(os.environ.get("ATTACHMENT_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+CACHE_MAX_AGE = float(os.environ.get("ATTACHMENT_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+# Sweeps run at most this often
+_SWEEP_INTERVAL = 60.0
+
+ALLOWED_TYPES = ("image/", "text/plain", "application/pdf")
+_CHUNK = 64 * 1024
+# Recent downloads kept by URL so the turn can pick up what prefetch started
+_MAX_TASKS = 256
+
+DOWNLOADS = metrics.counter("buckeyebot_attachments_total", "Inbound attachments by outcome", ("outcome",))
+DOWNLOAD_BYTES = metrics.histogram("buckeyebot_attachment_bytes", "Size of downloaded attachments", buckets=metrics.BYTES_BUCKETS)
+EVICTED = metrics.counter("buckeyebot_attachment_evictions_total", "Cached attachment files removed by the sweep")
+DOWNLOAD_SECONDS = metrics.histogram("buckeyebot_attachment_seconds", "Attachment download and extraction time")
+
+
+class AttachmentRejected(Exception):
+    pass
+
+
+@dataclass
+class Attachment:
+    filename: str
+    mime_type: str
+    size: int
+    sha256: str
+    text: str = ""
+
+    def describe(self) -> str:
+        header = f"[Attachment: {self.filename or 'file'} ({self.mime_type}, {_human(self.size)})]"
+        return f"{header}\n{self.text}" if self.text else header
+
+
+_tasks: OrderedDict[str, asyncio.Task] = OrderedDict()  # url -> download task, running or done
+_limit: asyncio.Semaphore | None = None
+_http: httpx.AsyncClient | None = None
+_last_sweep = 0.0
+_sweeping: set[asyncio.Task] = set()  # the loop only keeps weak references to tasks
+
+
+def prefetch(attachments: list[dict]) -> None:
+    """Start downloading in the background. Safe to call more than once per URL."""
+    for att in attachments:
+        url = att.get("url", "")
+        if url and url not in _tasks:
+            _tasks[url] = asyncio.create_task(_ingest(att))
+            while len(_tasks) > _MAX_TASKS:
+                _tasks.popitem(last=False)
+
+
+async def describe_all(attachments: list[dict], timeout: float = MAX_WAIT) -> str:
+    """Text for the agent about each attachment, waiting at most `timeout` seconds in total."""
+    if not attachments:
+        return ""
+    prefetch(attachments)
+    tasks = [_tasks.get(a.get("url", "")) for a in attachments]
+    pending = [t for t in tasks if t is not None]
+    if pending:
+        await asyncio.wait(pending, timeout=timeout)
+
+    lines = []
+    for att, task in zip(attachments, tasks):
+        name = att.get("filename") or "file"
+        if task is None or not task.done():
+            lines.append(f"[Attachment: {name} (still downloading)]")
+        elif task.exception() is not None:
+            lines.append(f"[Attachment: {name} (could not be read: {task.exception()})]")
+        else:
+            lines.append(task.result().describe())
+    return "\n\n".join(lines)
+
+
+async def _ingest(att: dict) -> Attachment:
+    global _limit
+    if _limit is None:
+        _limit = asyncio.Semaphore(CONCURRENCY)
+    started = time.monotonic()
+    try:
+        async with _limit:
+            attachment = await _download(att)
+        attachment.text = await asyncio.to_thread(_extract, attachment)
+        return attachment
+    except AttachmentRejected as e:
+        DOWNLOADS.inc(outcome="rejected")
+        logger.info("Skipped attachment %s: %s", att.get("filename") or att.get("url"), e)
+        raise
+    except Exception:
+        DOWNLOADS.inc(outcome="error")
+        logger.warning("Failed to ingest attachment %s", att.get("url"), exc_info=True)
+        raise AttachmentRejected("download failed") from None
+    finally:
+        DOWNLOAD_SECONDS.observe(time.monotonic() - started)
+
+
+async def _download(att: dict) -> Attachment:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(timeout=30, follow_redirects=True)
+
+    declared = att.get("mime_type", "")
+    if declared and not _allowed(declared):
+        raise AttachmentRejected(f"unsupported type {declared}")
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tracing.span("http", "attachment") as span:
+        async with _http.stream("GET", att["url"]) as resp:
+            resp.raise_for_status()
+            mime_type = resp.headers.get("content-type", declared).split(";")[0].strip() or declared
+            if not _allowed(mime_type):
+                raise AttachmentRejected(f"unsupported type {mime_type}")
+            if int(resp.headers.get("content-length") or 0) > MAX_BYTES:
+                raise AttachmentRejected(f"larger than {_human(MAX_BYTES)}")
+
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    async for chunk in resp.aiter_bytes(_CHUNK):
+                        size += len(chunk)
+                        if size > MAX_BYTES:
+                            raise AttachmentRejected(f"larger than {_human(MAX_BYTES)}")
+                        digest.update(chunk)
+                        f.write(chunk)
+                sha = digest.hexdigest()
+                path = CACHE_DIR / sha
+                span.bytes = size
+                span.cache = "hit" if path.exists() else "miss"
+                if path.exists():
+                    DOWNLOADS.inc(outcome="cached")
+                    path.touch()
+                else:
+                    os.replace(tmp, path)
+                    DOWNLOADS.inc(outcome="downloaded")
+                    DOWNLOAD_BYTES.observe(size)
+            finally:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+
+    if span.cache == "miss":
+        _maybe_sweep()
+    return Attachment(att.get("filename", ""), mime_type, size, sha)
+
+
+def _maybe_sweep() -> None:
+    global _last_sweep
+    if time.monotonic() - _last_sweep < _SWEEP_INTERVAL:
+        return
+    _last_sweep = time.monotonic()
+    task = asyncio.create_task(asyncio.to_thread(_sweep_logged))
+    _sweeping.add(task)
+    task.add_done_callback(_sweeping.discard)
+
+
+def _sweep_logged() -> None:
+    try:
+        sweep()
+    except OSError:
+        logger.warning("Attachment cache sweep failed", exc_info=True)
+
+
+def sweep(max_bytes: int = CACHE_MAX_BYTES, max_age: float = CACHE_MAX_AGE) -> None:
+    """Remove cached files older than max_age, then the least recently used beyond max_bytes."""
+    now = time.time()
+    entries = []
+    for path in CACHE_DIR.iterdir():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.suffix == ".part" and now - stat.st_mtime < 3600:
+            continue  # a download in progress
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in entries:
+        if now - mtime < max_age and total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        EVICTED.inc()
+
+
+def _extract(attachment: Attachment) -> str:
+    """Extract text once per content hash; the result is cached next to the file."""
+    if not (attachment.mime_type.startswith("text/") or attachment.mime_type == "application/pdf"):
+        return ""
+    cached = CACHE_DIR / f"{attachment.sha256}.txt"
+    with tracing.span("cache", "attachment_text") as span:
+        if cached.exists():
+            span.cache = "hit"
+            cached.touch()
+            return cached.read_text()
+        span.cache = "miss"
+
+        path = CACHE_DIR / attachment.sha256
+        if attachment.mime_type == "application/pdf":
+            if PdfReader is None:
+                return "(PDF text extraction unavailable: install pypdf)"
+            text = "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+        else:
+            text = path.read_bytes().decode("utf-8", errors="replace")
+
+        text = text.strip()
+        if len(text) > MAX_CHARS:
+            text = text[:MAX_CHARS] + "\n... (truncated)"
+        cached.write_text(text)
+        return text
+
+
+def _allowed(mime_type: str) -> bool:
+    return mime_type.startswith(ALLOWED_TYPES)
+
+
+def _human(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{max(1, size // 1024)} KB"
@@ -1,43 +1,174 @@
+"""Phone number <-> Linq chat id mappings.
+
+Backed by SQLite in WAL mode so several worker processes can share one file.
+Reads are served from an in-memory cache in both directions (phone -> chat for
+replies, chat -> phone for status and reaction events), falling back to the
+database for mappings another worker wrote. Writes that don't change anything
+are skipped; the rest land in the cache at once and are flushed in batches by
+a background thread every FLUSH_INTERVAL seconds and at exit. Deletes stay as
+tombstones in the pending buffer until flushed, so lookups don't fall back to
+the stale row, and the flush writes on its own connection outside the lock.
+"""
+
+import atexit
 import json
 import logging
+import os
+import sqlite3
+import threading
+import time
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-_store: dict[str, str] = {}  # phone_number -> chat_id
-_store_path: Path = Path(__file__).resolve().parent.parent / ".linq_chats.json"
+_root = Path(__file__).resolve().parent.parent
+_store_path: Path = Path(os.environ.get("LINQ_CHAT_DB", _root / ".linq_chats.db"))
+_legacy_path: Path = _root / ".linq_chats.json"
+
+FLUSH_INTERVAL = float(os.environ.get("LINQ_CHAT_FLUSH_INTERVAL", "1.0"))
+
+_by_phone: dict[str, str] = {}  # phone_number -> chat_id
+_by_chat: dict[str, str] = {}  # chat_id -> phone_number
+_dirty: dict[str, str | None] = {}  # phone_number -> chat_id, or None to delete
+_flushing: dict[str, str | None] = {}  # the batch currently being written
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_conn: sqlite3.Connection | None = None
+_writer: sqlite3.Connection | None = None
+
+
+def _deleted(phone_number: str) -> bool:
+    """Whether a delete for this phone is waiting to reach the database."""
+    if phone_number in _dirty:
+        return _dirty[phone_number] is None
+    return phone_number in _flushing and _flushing[phone_number] is None
 
 
 def get_chat_id(phone_number: str) -> str | None:
-    return _store.get(phone_number)
+    with _lock:
+        chat_id = _by_phone.get(phone_number)
+        if chat_id is None and _conn is not None and not _deleted(phone_number):
+            row = _conn.execute("SELECT chat_id FROM chats WHERE phone = ?", (phone_number,)).fetchone()
+            if row:
+                chat_id = row[0]
+                _cache(phone_number, chat_id)
+        return chat_id
+
+
+def get_phone_number(chat_id: str) -> str | None:
+    """Reverse lookup for events that only carry a chat id."""
+    with _lock:
+        phone = _by_chat.get(chat_id)
+        if phone is None and _conn is not None:
+            row = _conn.execute("SELECT phone FROM chats WHERE chat_id = ?", (chat_id,)).fetchone()
+            if row and not _deleted(row[0]):
+                phone = row[0]
+                _cache(phone, chat_id)
+        return phone
 
 
 def set_chat_id(phone_number: str, chat_id: str) -> None:
-    _store[phone_number] = chat_id
-    _save()
+    with _lock:
+        if _by_phone.get(phone_number) == chat_id:
+            return
+        _cache(phone_number, chat_id)
+        _dirty[phone_number] = chat_id
 
 
 def delete_chat_id(phone_number: str) -> None:
-    _store.pop(phone_number, None)
-    _save()
+    with _lock:
+        chat_id = _by_phone.pop(phone_number, None)
+        if chat_id is not None:
+            _by_chat.pop(chat_id, None)
+        _dirty[phone_number] = None
 
 
 def load() -> None:
-    """Load the chat store from disk. Safe to call at startup."""
-    global _store
-    if _store_path.exists():
+    """Open the store, migrate the legacy JSON file once, and start the flusher. Safe to call at startup."""
+    global _conn, _writer
+    with _lock:
+        if _conn is not None:
+            return
+        try:
+            _conn = sqlite3.connect(_store_path, timeout=5, check_same_thread=False, isolation_level=None)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute("CREATE TABLE IF NOT EXISTS chats (phone TEXT PRIMARY KEY, chat_id TEXT NOT NULL)")
+            _conn.execute("CREATE INDEX IF NOT EXISTS chats_by_chat_id ON chats (chat_id)")
+            _writer = sqlite3.connect(_store_path, timeout=5, check_same_thread=False, isolation_level=None)
+        except sqlite3.Error:
+            logger.warning("Failed to open chat store at %s, keeping mappings in memory", _store_path)
+            _conn = None
+            return
+
+        _migrate_legacy()
+        for phone, chat_id in _conn.execute("SELECT phone, chat_id FROM chats"):
+            _cache(phone, chat_id)
+        logger.info("Loaded %d chat mappings from %s", len(_by_phone), _store_path)
+
+    threading.Thread(target=_flush_loop, name="chat-store-flush", daemon=True).start()
+    atexit.register(flush)
+
+
+def flush() -> None:
+    """Write pending changes to disk in one transaction.
+
+    The pending buffer is swapped out under the lock and written outside it,
+    so lookups on the event loop never wait on SQLite's busy timeout.
+    """
+    global _flushing
+    with _flush_lock:
+        with _lock:
+            if _writer is None or not _dirty:
+                return
+            _flushing = dict(_dirty)
+            _dirty.clear()
+        batch = _flushing
+        upserts = [(p, c) for p, c in batch.items() if c is not None]
+        deletes = [(p,) for p, c in batch.items() if c is None]
         try:
-            _store = json.loads(_store_path.read_text())
-            logger.info("Loaded %d chat mappings from %s", len(_store), _store_path)
-        except (json.JSONDecodeError, OSError):
-            logger.warning("Failed to load chat store from %s, starting fresh", _store_path)
-            _store = {}
-    else:
-        _store = {}
+            with _writer:
+                _writer.execute("BEGIN")
+                _writer.executemany(
+                    "INSERT INTO chats (phone, chat_id) VALUES (?, ?) "
+                    "ON CONFLICT(phone) DO UPDATE SET chat_id = excluded.chat_id",
+                    upserts,
+                )
+                _writer.executemany("DELETE FROM chats WHERE phone = ?", deletes)
+        except sqlite3.Error:
+            logger.warning("Failed to persist chat store to %s, will retry", _store_path)
+            with _lock:
+                for phone, chat_id in batch.items():
+                    _dirty.setdefault(phone, chat_id)
+        finally:
+            with _lock:
+                _flushing = {}
 
 
-def _save() -> None:
+def _cache(phone_number: str, chat_id: str) -> None:
+    old = _by_phone.get(phone_number)
+    if old is not None:
+        _by_chat.pop(old, None)
+    _by_phone[phone_number] = chat_id
+    _by_chat[chat_id] = phone_number
+
+
+def _migrate_legacy() -> None:
+    if not _legacy_path.exists():
+        return
+    if _conn.execute("SELECT 1 FROM chats LIMIT 1").fetchone():
+        return
     try:
-        _store_path.write_text(json.dumps(_store, indent=2))
-    except OSError:
-        logger.warning("Failed to persist chat store to %s", _store_path)
+        legacy = json.loads(_legacy_path.read_text())
+    except (json.JSONDecodeError, OSError):
+        logger.warning("Failed to read legacy chat store %s, skipping migration", _legacy_path)
+        return
+    with _conn:
+        _conn.execute("BEGIN")
+        _conn.executemany("INSERT OR IGNORE INTO chats (phone, chat_id) VALUES (?, ?)", legacy.items())
+    logger.info("Migrated %d chat mappings from %s", len(legacy), _legacy_path)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
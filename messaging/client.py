@@ -1,22 +1,49 @@
 import asyncio
 import logging
+import os
+import time
 
 import httpx
 
+from messaging.resilience import CircuitBreaker, LinqUnavailableError, full_jitter, parse_retry_after
+from telemetry import metrics, tracing
+
 logger = logging.getLogger(__name__)
 
-_BASE_URL = "https://api.linqapp.com/api/partner/v3"
+_BASE_URL = os.environ.get("LINQ_API_URL", "https://api.linqapp.com/api/partner/v3")
 _TIMEOUT = 15.0
 _MAX_RETRIES = 3
+_MAX_RETRY_AFTER = 30.0
+
+# Requests in flight across all chats; best-effort calls are shed above SHED_AT of it
+MAX_CONCURRENCY = int(os.environ.get("LINQ_MAX_CONCURRENCY", "16"))
+SHED_AT = 0.75
+
+RETRIES = metrics.counter("buckeyebot_linq_retries_total", "Linq requests retried", ("endpoint", "reason"))
+SHED = metrics.counter("buckeyebot_linq_shed_total", "Best-effort Linq calls dropped while the API struggles", ("endpoint",))
+CIRCUIT_OPEN = metrics.counter("buckeyebot_linq_circuit_open_total", "Linq calls refused by an open circuit", ("endpoint",))
 
 
 class LinqClient:
-    """Async HTTP client for the Linq Partner API v3."""
+    """Async HTTP client for the Linq Partner API v3.
+
+    Retries 429/5xx and network errors with full-jitter backoff, honouring
+    Retry-After. Each endpoint has its own circuit breaker, and all requests
+    share one concurrency limit. Best-effort calls (typing, read receipts,
+    reactions) are never retried and are shed first when Linq is throttling
+    us or the concurrency limit is nearly used up, so real replies still get
+    through. They still go through the circuit breaker, so they can probe a
+    recovering endpoint like any other call.
+    """
 
     def __init__(self, api_token: str, base_url: str = _BASE_URL):
         self._token = api_token
         self._base_url = base_url.rstrip("/")
         self._http: httpx.AsyncClient | None = None
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._limit = asyncio.Semaphore(MAX_CONCURRENCY)
+        self._in_flight = 0
+        self._throttled_until = 0.0
 
     async def _client(self) -> httpx.AsyncClient:
         if self._http is None or self._http.is_closed:
@@ -30,35 +57,83 @@ class LinqClient:
             )
         return self._http
 
-    async def _request(self, method: str, path: str, **kwargs) -> dict:
+    def _struggling(self) -> bool:
+        return time.monotonic() < self._throttled_until or self._in_flight >= MAX_CONCURRENCY * SHED_AT
+
+    async def _request(self, method: str, path: str, best_effort: bool = False, **kwargs) -> dict:
+        endpoint = f"{method} {tracing.route_name(path)}"
+        breaker = self._breakers.setdefault(endpoint, CircuitBreaker())
+        if best_effort and self._struggling():
+            SHED.inc(endpoint=endpoint)
+            raise LinqUnavailableError(f"Shed best-effort {endpoint}")
+        if not breaker.allow():
+            CIRCUIT_OPEN.inc(endpoint=endpoint)
+            raise LinqUnavailableError(f"Circuit open for {endpoint}")
+        probe = breaker.state == CircuitBreaker.HALF_OPEN
+
+        try:
+            with tracing.span("linq", endpoint) as span:
+                return await self._send(span, breaker, endpoint, method, path, 1 if best_effort else _MAX_RETRIES, **kwargs)
+        finally:
+            if probe and breaker.state == CircuitBreaker.HALF_OPEN:
+                # The probe ended without a verdict (429, cancelled): count it as failed so the next one can go
+                breaker.record_failure()
+
+    async def _send(
+        self,
+        span: tracing.Span,
+        breaker: CircuitBreaker,
+        endpoint: str,
+        method: str,
+        path: str,
+        attempts: int,
+        **kwargs,
+    ) -> dict:
         client = await self._client()
-        last_exc: Exception | None = None
 
-        for attempt in range(_MAX_RETRIES):
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
             try:
-                resp = await client.request(method, path, **kwargs)
-                if resp.status_code == 429 or resp.status_code >= 500:
-                    wait = 2**attempt
-                    logger.warning(
-                        "Linq API %s %s returned %d, retrying in %ds",
-                        method, path, resp.status_code, wait,
-                    )
-                    await asyncio.sleep(wait)
-                    continue
-                resp.raise_for_status()
-                if resp.status_code == 204:
-                    return {}
-                return resp.json()
-            except httpx.HTTPStatusError as e:
-                raise
+                async with self._limit:
+                    self._in_flight += 1
+                    try:
+                        resp = await client.request(method, path, **kwargs)
+                    finally:
+                        self._in_flight -= 1
             except httpx.HTTPError as e:
-                last_exc = e
-                wait = 2**attempt
-                logger.warning("Linq API request error: %s, retrying in %ds", e, wait)
+                breaker.record_failure()
+                if last_attempt:
+                    raise
+                wait = full_jitter(attempt)
+                RETRIES.inc(endpoint=endpoint, reason="network")
+                logger.warning("Linq API request error: %s, retrying in %.1fs", e, wait)
+                await asyncio.sleep(wait)
+                continue
+
+            span.bytes += len(resp.content)
+            if resp.status_code == 429 or resp.status_code >= 500:
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                if resp.status_code == 429:
+                    self._throttled_until = time.monotonic() + (retry_after or full_jitter(attempt))
+                else:
+                    breaker.record_failure()
+                if last_attempt:
+                    resp.raise_for_status()
+                wait = min(retry_after, _MAX_RETRY_AFTER) if retry_after is not None else full_jitter(attempt)
+                RETRIES.inc(endpoint=endpoint, reason=str(resp.status_code))
+                logger.warning(
+                    "Linq API %s %s returned %d, retrying in %.1fs",
+                    method, path, resp.status_code, wait,
+                )
                 await asyncio.sleep(wait)
+                continue
+
+            breaker.record_success()
+            resp.raise_for_status()
+            if resp.status_code == 204:
+                return {}
+            return resp.json()
 
-        if last_exc:
-            raise last_exc
         return {}
 
     # -- Chats --
@@ -81,15 +156,15 @@ class LinqClient:
     # -- Typing indicators --
 
     async def start_typing(self, chat_id: str) -> None:
-        await self._request("POST", f"/chats/{chat_id}/typing")
+        await self._request("POST", f"/chats/{chat_id}/typing", best_effort=True)
 
     async def stop_typing(self, chat_id: str) -> None:
-        await self._request("DELETE", f"/chats/{chat_id}/typing")
+        await self._request("DELETE", f"/chats/{chat_id}/typing", best_effort=True)
 
     # -- Read receipts --
 
     async def mark_read(self, chat_id: str) -> None:
-        await self._request("POST", f"/chats/{chat_id}/read")
+        await self._request("POST", f"/chats/{chat_id}/read", best_effort=True)
 
     # -- Reactions --
 
@@ -98,6 +173,7 @@ class LinqClient:
             "POST",
             f"/messages/{message_id}/reactions",
             json={"operation": "add", "type": reaction_type},
+            best_effort=True,
         )
 
     async def remove_reaction(self, message_id: str, reaction_type: str) -> None:
@@ -105,6 +181,7 @@ class LinqClient:
             "POST",
             f"/messages/{message_id}/reactions",
             json={"operation": "remove", "type": reaction_type},
+            best_effort=True,
         )
 
     # -- Webhook subscriptions --
@@ -0,0 +1,84 @@
+"""Webhook delivery deduplication.
+
+Linq retries deliveries it considers failed, so the same event can arrive more
+than once. Each event is claimed by key (see events.delivery_key) in an
+in-memory, time-windowed LRU. Set WEBHOOK_DEDUPE_DB to a SQLite path to also
+share claims between worker processes on the same host.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = float(os.environ.get("WEBHOOK_DEDUPE_TTL", "3600"))
+MAX_ENTRIES = int(os.environ.get("WEBHOOK_DEDUPE_MAX_ENTRIES", "10000"))
+DB_PATH = os.environ.get("WEBHOOK_DEDUPE_DB", "")
+
+# Expired rows in the shared table are purged once every this many claims
+_PURGE_EVERY = 500
+
+DUPLICATES = metrics.counter("buckeyebot_webhook_duplicates_total", "Webhook deliveries acknowledged as duplicates")
+
+
+class Deduper:
+    def __init__(self, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES, db_path: str = DB_PATH):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._seen: OrderedDict[str, float] = OrderedDict()  # key -> expiry
+        self._lock = threading.Lock()
+        self._claims = 0
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+
+    def claim(self, key: str) -> bool:
+        """Record a delivery. Returns False if the key was already claimed within the TTL."""
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            if key in self._seen:
+                DUPLICATES.inc()
+                return False
+            if self._db is not None and not self._claim_shared(key, now):
+                DUPLICATES.inc()
+                return False
+            self._seen[key] = now + self._ttl
+            return True
+
+    def release(self, key: str) -> None:
+        """Forget a claim whose event could not be accepted, so a redelivery is processed."""
+        with self._lock:
+            self._seen.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM seen WHERE key = ?", (key,))
+
+    def _evict(self, now: float) -> None:
+        while self._seen:
+            key, expires = next(iter(self._seen.items()))
+            if expires > now and len(self._seen) < self._max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def _claim_shared(self, key: str, now: float) -> bool:
+        try:
+            self._claims += 1
+            if self._claims % _PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM seen WHERE expires <= ?", (now,))
+            self._db.execute("DELETE FROM seen WHERE key = ? AND expires <= ?", (key, now))
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO seen (key, expires) VALUES (?, ?)", (key, now + self._ttl)
+            )
+            return cur.rowcount == 1
+        except sqlite3.Error:
+            # Fall back to per-process dedupe rather than dropping the event
+            logger.warning("Shared dedupe store unavailable, using in-memory only")
+            return True
@@ -0,0 +1,116 @@
+"""Delivery latency from Linq status events.
+
+Every message we send is recorded by id with its send time, the service it
+went over and, when it answers a student, the time of their inbound message.
+message.delivered / message.failed events are joined against those records to
+give what the student actually experiences: send-to-delivered and
+inbound-to-delivered latency, and failure counts, per service on /metrics.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+
+from messaging.events import InboundMessage, StatusEvent
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+# Sends with no status after this long are forgotten
+TTL_SECONDS = float(os.environ.get("DELIVERY_TRACK_TTL", "3600"))
+MAX_TRACKED = int(os.environ.get("DELIVERY_TRACK_MAX", "10000"))
+
+SERVICES = {"imessage": "iMessage", "rcs": "RCS", "sms": "SMS"}
+DELIVERY_BUCKETS = (0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60, 120, 300)
+
+SEND_TO_DELIVERED = metrics.histogram(
+    "buckeyebot_delivery_send_seconds", "Send to delivered latency", ("service",), DELIVERY_BUCKETS
+)
+INBOUND_TO_DELIVERED = metrics.histogram(
+    "buckeyebot_delivery_inbound_seconds",
+    "Student's message to our reply delivered",
+    ("service",),
+    DELIVERY_BUCKETS,
+)
+OUTCOMES = metrics.counter(
+    "buckeyebot_delivery_total", "Sent messages by final delivery status", ("service", "status")
+)
+
+_inbound_at: ContextVar[float | None] = ContextVar("inbound_at", default=None)
+
+
+def service_label(service: str | None) -> str:
+    return SERVICES.get((service or "").lower(), "other")
+
+
+def start_inbound(msg: InboundMessage) -> None:
+    """Bind the student's message time to the current turn, so replies sent from it are timed against it."""
+    _inbound_at.set(_parse_timestamp(msg.sent_at) or time.time())
+
+
+@dataclass
+class _Sent:
+    sent: float
+    service: str
+    inbound_at: float | None
+
+
+class DeliveryTracker:
+    def __init__(self, ttl: float = TTL_SECONDS, max_entries: int = MAX_TRACKED):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._pending: OrderedDict[str, _Sent] = OrderedDict()  # message id -> send record
+
+    def sent(self, message_id: str, service: str | None) -> None:
+        if not message_id:
+            return
+        now = time.time()
+        self._evict(now)
+        self._pending[message_id] = _Sent(now, service_label(service), _inbound_at.get())
+
+    def status(self, event: StatusEvent) -> None:
+        """Join a status event against its send. Reads count as delivery if no delivered event came first."""
+        record = self._pending.pop(event.message_id, None)
+        if record is None:
+            return
+        service = service_label(event.service) if event.service else record.service
+        if event.status == "failed":
+            OUTCOMES.inc(service=service, status="failed")
+            logger.warning("Message %s via %s failed to deliver", event.message_id, service)
+            return
+        now = time.time()
+        OUTCOMES.inc(service=service, status="delivered")
+        SEND_TO_DELIVERED.observe(now - record.sent, service=service)
+        if record.inbound_at is not None:
+            INBOUND_TO_DELIVERED.observe(now - record.inbound_at, service=service)
+
+    def _evict(self, now: float) -> None:
+        while self._pending:
+            message_id, record = next(iter(self._pending.items()))
+            if now - record.sent < self._ttl and len(self._pending) < self._max_entries:
+                break
+            self._pending.popitem(last=False)
+            OUTCOMES.inc(service=record.service, status="unknown")
+
+
+def _parse_timestamp(value: str) -> float | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+_tracker: DeliveryTracker | None = None
+
+
+def get_tracker() -> DeliveryTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = DeliveryTracker()
+    return _tracker
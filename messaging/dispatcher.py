@@ -0,0 +1,130 @@
+"""Bounded event queue served by a fixed worker pool on one long-lived event loop.
+
+The ASGI app runs the dispatcher on its own loop. The Flask compatibility
+route starts it on a background loop thread and submits across threads.
+Either way, HTTP clients and per-chat state live on a single loop, and a
+full queue is reported back so the webhook can answer 503 + Retry-After.
+On shutdown drain() refuses new events (also answered with 503) and gives
+queued and running ones until a deadline to finish.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.environ.get("WEBHOOK_WORKERS", "8"))
+QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", "100"))
+DRAIN_SECONDS = float(os.environ.get("WEBHOOK_DRAIN_SECONDS", "25"))
+
+QUEUE_DEPTH = metrics.gauge("buckeyebot_webhook_queue_depth", "Webhook events waiting for a worker")
+BUSY_WORKERS = metrics.gauge("buckeyebot_webhook_busy_workers", "Workers currently processing an event")
+REJECTED = metrics.counter("buckeyebot_webhook_rejected_total", "Webhook events rejected because the queue was full")
+QUEUE_WAIT = metrics.histogram("buckeyebot_webhook_queue_wait_seconds", "Time events spend queued before a worker picks them up")
+
+
+class Dispatcher:
+    def __init__(self, handler, workers: int = WORKERS, max_queue: int = QUEUE_SIZE):
+        self._handler = handler
+        self._workers = workers
+        self._max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.draining = False
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def start(self) -> None:
+        """Create the queue and workers on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+        logger.info("Dispatcher started with %d workers, queue size %d", self._workers, self._max_queue)
+
+    def start_in_thread(self) -> None:
+        """Run the dispatcher on a dedicated background loop (Flask compatibility mode). Idempotent."""
+        with self._start_lock:
+            if self.running:
+                return
+            self._start_thread()
+
+    def _start_thread(self) -> None:
+        ready = threading.Event()
+
+        def run() -> None:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="dispatcher", daemon=True).start()
+        ready.wait()
+
+    def submit(self, event) -> bool:
+        """Enqueue an event from the dispatcher's loop. Returns False when saturated or draining."""
+        if self.draining:
+            return False
+        try:
+            self._queue.put_nowait((event, time.monotonic()))
+        except asyncio.QueueFull:
+            REJECTED.inc()
+            return False
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def submit_threadsafe(self, event) -> bool:
+        """Enqueue an event from another thread. Returns False when saturated."""
+        future = asyncio.run_coroutine_threadsafe(self._submit(event), self.loop)
+        return future.result()
+
+    async def _submit(self, event) -> bool:
+        return self.submit(event)
+
+    async def put(self, event) -> None:
+        """Enqueue an event, waiting for room instead of rejecting it (used to resume journaled work)."""
+        await self._queue.put((event, time.monotonic()))
+        QUEUE_DEPTH.set(self._queue.qsize())
+
+    async def drain(self, timeout: float = DRAIN_SECONDS) -> None:
+        """Stop accepting events, wait up to `timeout` for queued and running ones, then stop."""
+        self.draining = True
+        logger.info("Draining %d queued webhook events (up to %.0fs)", self._queue.qsize(), timeout)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Drain deadline passed with work in flight; it resumes from the journal on restart")
+        await self.stop()
+
+    def drain_threadsafe(self, timeout: float = DRAIN_SECONDS) -> None:
+        """Drain a dispatcher running on a background loop from another thread."""
+        asyncio.run_coroutine_threadsafe(self.drain(timeout), self.loop).result()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            event, enqueued = await self._queue.get()
+            QUEUE_DEPTH.set(self._queue.qsize())
+            QUEUE_WAIT.observe(time.monotonic() - enqueued)
+            BUSY_WORKERS.inc()
+            try:
+                await self._handler(event)
+            except Exception:
+                logger.exception("Error processing webhook event")
+            finally:
+                BUSY_WORKERS.dec()
+                self._queue.task_done()
@@ -18,6 +18,7 @@ class StatusEvent:
     message_id: str
     chat_id: str
     status: str  # "delivered" | "read" | "failed"
+    service: str = ""
 
 
 @dataclass
@@ -51,6 +52,7 @@ def parse_webhook_event(
             message_id=data.get("id", ""),
             chat_id=data.get("chat", {}).get("id", ""),
             status=status,
+            service=data.get("service", ""),
         )
     elif event_type in ("reaction.added", "reaction.removed"):
         return ReactionEvent(
@@ -75,6 +77,20 @@ def parse_webhook_event(
     return None
 
 
+def delivery_key(event: InboundMessage | StatusEvent | ReactionEvent | TypingEvent) -> str | None:
+    """Idempotency key for a parsed event (event type plus message id), or None if it has no id."""
+    if isinstance(event, InboundMessage):
+        event_type = "message.received"
+    elif isinstance(event, StatusEvent):
+        event_type = f"message.{event.status}"
+    elif isinstance(event, ReactionEvent):
+        # Several reactions can target the same message
+        event_type = f"reaction.{'added' if event.added else 'removed'}.{event.reaction}"
+    else:
+        return None
+    return f"{event_type}:{event.message_id}" if event.message_id else None
+
+
 def _parse_inbound_message(data: dict) -> InboundMessage:
     """Extract text and attachments from a message.received payload."""
     parts = data.get("parts", [])
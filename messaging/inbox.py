@@ -0,0 +1,82 @@
+"""Per-student ordered inbox with burst coalescing.
+
+Students often split one question over several quick texts. The first message
+from a number makes the current worker that number's drainer: it waits until
+the student has been quiet for DEBOUNCE_SECONDS (capped at MAX_DEBOUNCE_SECONDS),
+then hands every pending message to the handler as one combined message.
+Texts that arrive while a turn is running queue up and become the next turn,
+so each student gets one agent run at a time and replies in order.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import os
+import time
+
+from messaging.events import InboundMessage
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_SECONDS = float(os.environ.get("INBOX_DEBOUNCE_SECONDS", "1.5"))
+MAX_DEBOUNCE_SECONDS = float(os.environ.get("INBOX_MAX_DEBOUNCE_SECONDS", "5"))
+
+COALESCED = metrics.histogram(
+    "buckeyebot_inbox_batch_size", "Inbound messages combined into one agent turn", buckets=(1, 2, 3, 4, 6, 10)
+)
+
+
+def combine(batch: list[InboundMessage]) -> InboundMessage:
+    """Merge a burst of messages into one; ids and timestamps come from the latest."""
+    if len(batch) == 1:
+        return batch[0]
+    return dataclasses.replace(
+        batch[-1],
+        text="\n".join(m.text for m in batch if m.text),
+        attachments=[a for m in batch for a in m.attachments],
+    )
+
+
+class Inbox:
+    def __init__(self, handler, on_done=None):
+        self._handler = handler
+        self._on_done = on_done  # called with each batch the handler finished without raising
+        self._pending: dict[str, list[InboundMessage]] = {}
+
+    async def put(self, msg: InboundMessage) -> None:
+        """Queue a message. Returns at once if this student already has a drainer."""
+        number = msg.from_number
+        if number in self._pending:
+            self._pending[number].append(msg)
+            return
+        self._pending[number] = [msg]
+        try:
+            await self._drain(number)
+        finally:
+            self._pending.pop(number, None)
+
+    async def _drain(self, number: str) -> None:
+        pending = self._pending[number]
+        while pending:
+            await self._wait_for_quiet(pending)
+            batch = pending[:]
+            del pending[:]
+            COALESCED.observe(len(batch))
+            if len(batch) > 1:
+                logger.info("Coalesced %d messages from %s", len(batch), number)
+            try:
+                await self._handler(combine(batch))
+            except Exception:
+                logger.exception("Error handling messages from %s", number)
+                continue
+            if self._on_done:
+                self._on_done(batch)
+
+    async def _wait_for_quiet(self, pending: list[InboundMessage]) -> None:
+        deadline = time.monotonic() + MAX_DEBOUNCE_SECONDS
+        while True:
+            seen = len(pending)
+            await asyncio.sleep(max(0.0, min(DEBOUNCE_SECONDS, deadline - time.monotonic())))
+            if len(pending) == seen or time.monotonic() >= deadline:
+                return
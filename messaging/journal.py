@@ -0,0 +1,74 @@
+"""Durable journal of inbound messages that have not been answered yet.
+
+A message is written to SQLite before its webhook is acknowledged and removed
+once its turn has replied, so a deploy or crash mid-turn leaves it behind and
+the next start picks it up again. Delivery is at-least-once: a process that
+dies between sending a reply and completing the entry answers it twice.
+Entries older than MAX_AGE are dropped on resume rather than answered late.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from messaging.events import InboundMessage
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+_root = Path(__file__).resolve().parent.parent
+DB_PATH = os.environ.get("WEBHOOK_JOURNAL_DB", str(_root / ".webhook_journal.db"))
+MAX_AGE = float(os.environ.get("WEBHOOK_JOURNAL_MAX_AGE", "3600"))
+
+RESUMED = metrics.counter("buckeyebot_journal_resumed_total", "Unanswered messages handed back for resuming")
+EXPIRED = metrics.counter("buckeyebot_journal_expired_total", "Unanswered messages too old to resume")
+
+
+class Journal:
+    def __init__(self, db_path: str = DB_PATH, max_age: float = MAX_AGE):
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS inbound (message_id TEXT PRIMARY KEY, payload TEXT NOT NULL, received REAL NOT NULL)"
+        )
+
+    def record(self, msg: InboundMessage) -> None:
+        payload = json.dumps(dataclasses.asdict(msg))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO inbound (message_id, payload, received) VALUES (?, ?, ?)",
+                (msg.message_id, payload, time.time()),
+            )
+
+    def complete(self, message_ids: list[str]) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM inbound WHERE message_id = ?", [(i,) for i in message_ids])
+
+    def pending(self) -> list[InboundMessage]:
+        """Unanswered messages in arrival order; expired ones are deleted."""
+        cutoff = time.time() - self._max_age
+        with self._lock:
+            expired = self._db.execute("DELETE FROM inbound WHERE received < ?", (cutoff,)).rowcount
+            rows = self._db.execute("SELECT payload FROM inbound ORDER BY received").fetchall()
+        if expired:
+            EXPIRED.inc(expired)
+            logger.warning("Dropped %d unanswered messages older than %ds", expired, self._max_age)
+        RESUMED.inc(len(rows))
+        return [InboundMessage(**json.loads(payload)) for (payload,) in rows]
+
+
+_journal: Journal | None = None
+
+
+def get_journal() -> Journal:
+    global _journal
+    if _journal is None:
+        _journal = Journal()
+    return _journal
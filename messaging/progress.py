@@ -0,0 +1,126 @@
+"""Progressive replies for long-running agent turns.
+
+A quick turn produces exactly one text: the answer. A slow turn gets a short
+acknowledgement once it passes ACK_DELAY seconds (or right away when a known
+slow tool starts), then at most MAX_UPDATES progress texts listing the lookups
+that finished since the previous text, spaced UPDATE_INTERVAL seconds apart.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from messaging import sender
+from messaging.typing_sessions import get_typing
+
+logger = logging.getLogger(__name__)
+
+ACK_DELAY = float(os.environ.get("PROGRESS_ACK_DELAY", "4"))
+UPDATE_INTERVAL = float(os.environ.get("PROGRESS_UPDATE_INTERVAL", "20"))
+MAX_UPDATES = int(os.environ.get("PROGRESS_MAX_UPDATES", "2"))
+
+ACK_TEXT = "On it, give me a moment..."
+
+# Tools that routinely take 30s+ get an immediate, specific acknowledgement
+SLOW_TOOLS = {
+    "get_class_schedule": "BuckeyeLink",
+    "get_grades": "BuckeyeLink",
+    "get_financial_aid_status": "BuckeyeLink",
+    "get_holds_and_todos": "BuckeyeLink",
+    "get_enrollment_info": "BuckeyeLink",
+    "get_buckeyelink_dashboard": "BuckeyeLink",
+    "search_grubhub_restaurants": "Grubhub",
+    "get_restaurant_menu": "Grubhub",
+    "place_grubhub_order": "Grubhub",
+    "get_upcoming_assignments": "Carmen",
+}
+
+
+def describe_tool(name: str) -> str:
+    """Turn a tool name into a short phrase, e.g. get_course_grades -> course grades."""
+    for prefix in ("get_", "search_", "find_"):
+        name = name.removeprefix(prefix)
+    return name.replace("_", " ")
+
+
+class ProgressReporter:
+    """Sends coalesced progress texts to one student while their turn runs."""
+
+    def __init__(self, to: str):
+        self.to = to
+        self._done = False
+        self._acked = False
+        self._updates = 0
+        self._last_sent = 0.0
+        self._finished: list[str] = []
+        self._timer: asyncio.Task | None = None
+        self._send_lock = asyncio.Lock()
+
+    def start(self) -> None:
+        """Arm the acknowledgement timer. Call when the agent starts working."""
+        self._timer = asyncio.create_task(self._after(ACK_DELAY, self._ack))
+
+    def tool_started(self, name: str) -> None:
+        source = SLOW_TOOLS.get(name)
+        if source and not self._acked and not self._done:
+            self._cancel_timer()
+            self._timer = asyncio.create_task(
+                self._ack(f"Checking {source}, this can take a minute...")
+            )
+
+    def tool_finished(self, name: str) -> None:
+        label = describe_tool(name)
+        if label not in self._finished:
+            self._finished.append(label)
+        if not self._acked or self._done or self._updates >= MAX_UPDATES:
+            return
+        if self._timer is None or self._timer.done():
+            delay = max(0.0, self._last_sent + UPDATE_INTERVAL - time.monotonic())
+            self._timer = asyncio.create_task(self._after(delay, self._update))
+
+    async def finish(self) -> None:
+        """Stop sending progress. Waits for an in-flight text so the reply lands after it."""
+        self._done = True
+        async with self._send_lock:
+            self._cancel_timer()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+
+    async def _after(self, delay: float, fn) -> None:
+        await asyncio.sleep(delay)
+        await fn()
+
+    async def _ack(self, text: str = ACK_TEXT) -> None:
+        if self._acked:
+            return
+        self._acked = True
+        await self._send(text)
+
+    async def _update(self) -> None:
+        if not self._finished or self._updates >= MAX_UPDATES:
+            return
+        self._updates += 1
+        done, self._finished = self._finished, []
+        await self._send(f"Got your {_join(done)}, still working on the rest...")
+
+    async def _send(self, text: str) -> None:
+        async with self._send_lock:
+            if self._done:
+                return
+            try:
+                await sender.send_message(self.to, text)
+                self._last_sent = time.monotonic()
+                # Delivering a message clears the recipient's typing indicator
+                get_typing().refresh(self.to)
+            except Exception:
+                logger.warning("Failed to send progress update to %s", self.to)
+
+
+def _join(items: list[str]) -> str:
+    if len(items) == 1:
+        return items[0]
+    return ", ".join(items[:-1]) + " and " + items[-1]
@@ -0,0 +1,74 @@
+"""Backoff and circuit-breaker primitives for the Linq transport."""
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class LinqUnavailableError(Exception):
+    """Raised without calling Linq when its circuit is open or a best-effort call is shed."""
+
+
+def full_jitter(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """AWS-style full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures, then lets one probe through every `reset_timeout` seconds.
+
+    A probe that never reports back (cancelled, or ended without a verdict)
+    stops blocking the circuit after another `reset_timeout`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if (
+            (self.state == self.OPEN and now - self._opened_at >= self.reset_timeout)
+            or (self.state == self.HALF_OPEN and now - self._probe_started >= self.reset_timeout)
+        ):
+            # Let a single probe through; everything else waits for its result
+            self.state = self.HALF_OPEN
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
@@ -1,11 +1,39 @@
+import asyncio
+import itertools
 import os
 import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
 
-from messaging import chat_store
+from messaging import chat_store, sms
+from messaging.delivery import get_tracker
 from messaging.client import LinqClient
+from telemetry import metrics
 
 logger = logging.getLogger(__name__)
 
+ALIVE_TIMEOUT = float(os.environ.get("ALIVE_SIGNAL_TIMEOUT", "5"))
+
+ALIVE_SECONDS = metrics.histogram("buckeyebot_alive_signal_seconds", "Latency of alive signals", ("signal",))
+ALIVE_TIMEOUTS = metrics.counter("buckeyebot_alive_signal_timeouts_total", "Alive signals abandoned after ALIVE_SIGNAL_TIMEOUT", ("signal",))
+
+# Outbound rate limit shared by every call to Linq (requests/second and burst)
+RATE_LIMIT = float(os.environ.get("LINQ_RATE_LIMIT", "10"))
+RATE_BURST = int(os.environ.get("LINQ_RATE_BURST", "20"))
+# Once this many calls are queued, new typing/read/reaction calls are dropped
+PRESSURE_QUEUE = int(os.environ.get("LINQ_PRESSURE_QUEUE", "32"))
+
+# Priority classes, most important first
+REPLY, TYPING, SIGNAL = 0, 1, 2
+_CLASS_NAMES = {REPLY: "reply", TYPING: "typing", SIGNAL: "signal"}
+# Queued low-priority calls older than this are no longer worth sending
+_MAX_AGE = {TYPING: 5.0, SIGNAL: 10.0}
+
+OUTBOUND_QUEUED = metrics.gauge("buckeyebot_outbound_queued", "Outbound Linq calls waiting for a rate-limit token", ("cls",))
+OUTBOUND_WAIT = metrics.histogram("buckeyebot_outbound_wait_seconds", "Time outbound Linq calls spent queued", ("cls",))
+OUTBOUND_DROPPED = metrics.counter("buckeyebot_outbound_dropped_total", "Low-priority outbound calls dropped under pressure", ("cls", "reason"))
+
 _linq_client: LinqClient | None = None
 
 # Valid iMessage tapback reaction types
@@ -19,21 +47,163 @@ def get_linq_client() -> LinqClient:
     return _linq_client
 
 
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token if one is available. Returns 0, or the seconds until the next token."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+@dataclass
+class _Call:
+    cls: int
+    seq: int
+    factory: object  # () -> awaitable
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class OutboundScheduler:
+    """Rate-limits outbound Linq calls on the event loop.
+
+    Calls for one chat run one at a time in submission order, so a typing stop
+    can never overtake the reply it precedes. Across chats the most important
+    class goes first (replies, then typing, then reads and reactions). When the
+    queue is backed up, new low-priority calls are dropped and queued ones that
+    went stale are skipped, so replies keep the tokens.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, burst: int = RATE_BURST, pressure: int = PRESSURE_QUEUE):
+        self._bucket = TokenBucket(rate, burst)
+        self._pressure = pressure
+        self._queues: OrderedDict[str, deque[_Call]] = OrderedDict()  # chat key -> calls in order
+        self._busy: set[str] = set()
+        self._queued = 0
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # The loop only keeps weak references to tasks
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, cls: int, key: str, factory):
+        """Run factory() once a token is free and key's earlier calls are done. Dropped calls return None."""
+        if cls != REPLY and self._queued >= self._pressure:
+            OUTBOUND_DROPPED.inc(cls=_CLASS_NAMES[cls], reason="pressure")
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        call = _Call(cls, next(self._seq), factory, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(key, deque()).append(call)
+        self._track(call, 1)
+        self._wakeup.set()
+        return await call.future
+
+    def _track(self, call: _Call, delta: int) -> None:
+        self._queued += delta
+        OUTBOUND_QUEUED.inc(delta, cls=_CLASS_NAMES[call.cls])
+
+    def _next(self) -> tuple[str, _Call] | None:
+        best = None
+        now = time.monotonic()
+        for key, queue in list(self._queues.items()):
+            if key in self._busy:
+                continue
+            while queue and self._skippable(queue[0], now):
+                self._track(queue.popleft(), -1)
+            if not queue:
+                del self._queues[key]
+                continue
+            if best is None or (queue[0].cls, queue[0].seq) < (best[1].cls, best[1].seq):
+                best = (key, queue[0])
+        return best
+
+    def _skippable(self, call: _Call, now: float) -> bool:
+        if call.future.done():  # caller gave up waiting
+            return True
+        if call.cls in _MAX_AGE and now - call.enqueued > _MAX_AGE[call.cls]:
+            OUTBOUND_DROPPED.inc(cls=_CLASS_NAMES[call.cls], reason="stale")
+            call.future.set_result(None)
+            return True
+        return False
+
+    async def _run(self) -> None:
+        while True:
+            picked = self._next()
+            if picked is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = self._bucket.take()
+            if wait:
+                await asyncio.sleep(wait)
+                continue  # re-pick: something more important may have arrived
+            key, call = picked
+            self._queues[key].popleft()
+            self._track(call, -1)
+            OUTBOUND_WAIT.observe(time.monotonic() - call.enqueued, cls=_CLASS_NAMES[call.cls])
+            self._busy.add(key)
+            task = asyncio.create_task(self._execute(key, call))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, key: str, call: _Call) -> None:
+        try:
+            result = await call.factory()
+        except Exception as e:
+            if not call.future.done():
+                call.future.set_exception(e)
+        else:
+            if not call.future.done():
+                call.future.set_result(result)
+        finally:
+            self._busy.discard(key)
+            self._wakeup.set()
+
+
+_scheduler: OutboundScheduler | None = None
+
+
+def get_scheduler() -> OutboundScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = OutboundScheduler()
+    return _scheduler
+
+
 async def send_message(to: str, text: str) -> dict:
     """Send a text message via iMessage/RCS/SMS."""
     client = get_linq_client()
     from_number = os.environ["LINQ_FROM_NUMBER"]
     preferred = os.environ.get("LINQ_PREFERRED_SERVICE", "iMessage")
 
+    scheduler = get_scheduler()
+
     chat_id = chat_store.get_chat_id(to)
     if not chat_id:
-        resp = await client.create_chat(from_number, [to])
+        resp = await scheduler.submit(REPLY, to, lambda: client.create_chat(from_number, [to]))
         chat_id = resp.get("chat", {}).get("id", "")
         if chat_id:
             chat_store.set_chat_id(to, chat_id)
 
-    parts = [{"type": "text", "value": text}]
-    return await client.send_message(chat_id, parts, service=preferred)
+    # SMS replies may go out as several messages; the per-chat queue keeps them in order
+    resp: dict = {}
+    for part in sms.format_reply(to, text):
+        parts = [{"type": "text", "value": part}]
+        resp = await scheduler.submit(REPLY, to, lambda parts=parts: client.send_message(chat_id, parts, service=preferred))
+        sent = resp.get("message", resp)
+        get_tracker().sent(sent.get("id", ""), sent.get("service") or sms.last_service(to) or preferred)
+    return resp
 
 
 async def start_typing(to: str) -> None:
@@ -42,7 +212,7 @@ async def start_typing(to: str) -> None:
     if not chat_id:
         return
     try:
-        await get_linq_client().start_typing(chat_id)
+        await get_scheduler().submit(TYPING, to, lambda: get_linq_client().start_typing(chat_id))
     except Exception:
         logger.debug("Failed to start typing indicator for %s", to)
 
@@ -53,7 +223,7 @@ async def stop_typing(to: str) -> None:
     if not chat_id:
         return
     try:
-        await get_linq_client().stop_typing(chat_id)
+        await get_scheduler().submit(TYPING, to, lambda: get_linq_client().stop_typing(chat_id))
     except Exception:
         logger.debug("Failed to stop typing indicator for %s", to)
 
@@ -64,7 +234,7 @@ async def mark_read(to: str) -> None:
     if not chat_id:
         return
     try:
-        await get_linq_client().mark_read(chat_id)
+        await get_scheduler().submit(SIGNAL, to, lambda: get_linq_client().mark_read(chat_id))
     except Exception:
         logger.debug("Failed to send read receipt for %s", to)
 
@@ -75,6 +245,35 @@ async def react_to_message(message_id: str, reaction: str = "like") -> None:
         logger.warning("Invalid reaction type %r, skipping", reaction)
         return
     try:
-        await get_linq_client().add_reaction(message_id, reaction)
+        await get_scheduler().submit(
+            SIGNAL, message_id, lambda: get_linq_client().add_reaction(message_id, reaction)
+        )
     except Exception:
         logger.debug("Failed to add reaction to %s", message_id)
+
+
+def send_alive_signals(to: str, message_id: str) -> asyncio.Task:
+    """Send read receipt and tapback concurrently in the background.
+
+    Returns the task so the caller can await it (it is bounded by ALIVE_TIMEOUT)
+    before sending the reply. The typing indicator is handled by typing_sessions.
+    """
+    return asyncio.create_task(_alive_signals(to, message_id))
+
+
+async def _alive_signals(to: str, message_id: str) -> None:
+    await asyncio.gather(
+        _timed("read", mark_read(to)),
+        _timed("reaction", react_to_message(message_id, "like")),
+    )
+
+
+async def _timed(signal: str, coro) -> None:
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(coro, ALIVE_TIMEOUT)
+    except asyncio.TimeoutError:
+        ALIVE_TIMEOUTS.inc(signal=signal)
+        logger.debug("Alive signal %s timed out", signal)
+    finally:
+        ALIVE_SECONDS.observe(time.monotonic() - started, signal=signal)
@@ -0,0 +1,147 @@
+"""SMS-aware formatting for outbound replies.
+
+A single character outside the GSM-7 alphabet (a curly quote, an em dash, an
+emoji) switches a whole SMS to UCS-2, which drops a segment from 160 to 70
+characters. Replies to students reaching us over SMS are normalized to GSM-7
+where that only swaps typography, then split at sentence boundaries into
+parts of at most SMS_SEGMENTS_PER_PART segments each. iMessage and RCS
+replies are sent untouched.
+"""
+
+import logging
+import os
+import re
+from collections import OrderedDict
+
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+# Carriers reassemble concatenated SMS up to a few segments; only longer replies are split.
+# 1 sends each part as a single-segment SMS.
+SEGMENTS_PER_PART = int(os.environ.get("SMS_SEGMENTS_PER_PART", "6"))
+
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension table characters take an escape septet plus their own
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+# (single segment, per segment when concatenated)
+GSM7_LIMITS = (160, 153)
+UCS2_LIMITS = (70, 67)
+
+# Typography with a plain GSM-7 equivalent
+_REPLACEMENTS = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-",
+    "…": "...", "•": "-",
+    "\u00a0": " ", "\u2002": " ", "\u2003": " ", "\u2009": " ", "\u202f": " ",
+    "\u200b": None, "\u200d": None, "\ufeff": None,
+})
+
+_SENTENCE = re.compile(r".+?(?:[.!?]+(?=\s|$)|\n|$)\s*", re.S)
+
+_MAX_REMEMBERED = 10000
+_services: OrderedDict[str, str] = OrderedDict()  # phone number -> last inbound service
+
+SEGMENTS = metrics.histogram(
+    "buckeyebot_sms_segments", "SMS segments per outbound reply", ("encoding",), buckets=(1, 2, 3, 4, 6, 8, 12)
+)
+NORMALIZED = metrics.counter("buckeyebot_sms_normalized_total", "SMS replies kept in GSM-7 by normalizing typography")
+
+
+def remember_service(number: str, service: str) -> None:
+    """Record how a student last reached us; replies go back over the same service."""
+    _services[number] = service
+    _services.move_to_end(number)
+    while len(_services) > _MAX_REMEMBERED:
+        _services.popitem(last=False)
+
+
+def last_service(number: str) -> str | None:
+    return _services.get(number)
+
+
+def is_sms(number: str) -> bool:
+    return (last_service(number) or "").upper() == "SMS"
+
+
+def is_gsm7(text: str) -> bool:
+    return all(c in GSM7_BASIC or c in GSM7_EXTENDED for c in text)
+
+
+def normalize(text: str) -> str:
+    """Swap typography for GSM-7 equivalents, but only if that makes the whole text GSM-7."""
+    if is_gsm7(text):
+        return text
+    normalized = text.translate(_REPLACEMENTS)
+    if is_gsm7(normalized):
+        NORMALIZED.inc()
+        return normalized
+    return text  # still UCS-2 (emoji, non-Latin script); keep the original characters
+
+
+def length(text: str, gsm7: bool) -> int:
+    """Length in septets (GSM-7) or UTF-16 code units (UCS-2)."""
+    if gsm7:
+        return len(text) + sum(c in GSM7_EXTENDED for c in text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def segment_count(text: str) -> int:
+    gsm7 = is_gsm7(text)
+    single, multi = GSM7_LIMITS if gsm7 else UCS2_LIMITS
+    n = length(text, gsm7)
+    return 1 if n <= single else -(-n // multi)
+
+
+def split(text: str, segments: int = SEGMENTS_PER_PART) -> list[str]:
+    """Pack whole sentences into parts of at most `segments` segments each."""
+    gsm7 = is_gsm7(text)
+    single, multi = GSM7_LIMITS if gsm7 else UCS2_LIMITS
+    capacity = single if segments <= 1 else segments * multi
+    if length(text, gsm7) <= capacity:
+        return [text]
+
+    parts: list[str] = []
+    current = ""
+    for piece in _pieces(text, capacity, gsm7):
+        if current and length(current + piece, gsm7) > capacity:
+            parts.append(current.strip())
+            current = ""
+        current += piece
+    if current.strip():
+        parts.append(current.strip())
+    return [p for p in parts if p]
+
+
+def format_reply(to: str, text: str) -> list[str]:
+    """Message texts to send for a reply: one unchanged text unless the student is on SMS."""
+    if not is_sms(to):
+        return [text]
+    text = normalize(text)
+    parts = split(text)
+    SEGMENTS.observe(sum(segment_count(p) for p in parts), encoding="gsm7" if is_gsm7(text) else "ucs2")
+    if len(parts) > 1:
+        logger.debug("Split SMS reply to %s into %d parts", to, len(parts))
+    return parts
+
+
+def _pieces(text: str, capacity: int, gsm7: bool):
+    """Sentences, with any sentence longer than capacity broken at words (or hard-cut)."""
+    for sentence in _SENTENCE.findall(text):
+        if length(sentence, gsm7) <= capacity:
+            yield sentence
+            continue
+        for word in re.findall(r"\S+\s*", sentence):
+            while length(word, gsm7) > capacity:
+                cut = capacity
+                while length(word[:cut], gsm7) > capacity:
+                    cut -= 1
+                yield word[:cut]
+                word = word[cut:]
+            yield word
+
@@ -0,0 +1,86 @@
+"""Typing indicator sessions for long-running turns.
+
+Linq typing indicators expire on their own and are cleared whenever a message
+is delivered, so one start_typing per inbound message goes dark long before a
+slow BuckeyeLink or Grubhub turn replies. A session keeps the indicator alive
+by re-sending it every REFRESH_SECONDS and straight after any message we send
+to the chat. Sessions are refcounted per student, so overlapping turns share
+one refresh loop, and bursts of refresh requests collapse into a single call.
+Ending a session before the reply costs nothing: the reply clears the
+indicator, so stop_typing is only sent when no message follows.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+
+from messaging import sender
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = float(os.environ.get("TYPING_REFRESH_SECONDS", "25"))
+
+TYPING_CALLS = metrics.counter("buckeyebot_typing_calls_total", "Typing indicator calls sent to Linq", ("action",))
+
+
+@dataclass
+class _Session:
+    refs: int = 0
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+
+
+class TypingSessions:
+    def __init__(self, refresh: float = REFRESH_SECONDS):
+        self._refresh = refresh
+        self._sessions: dict[str, _Session] = {}
+
+    def acquire(self, to: str) -> None:
+        """Show the typing indicator to `to` until the matching release()."""
+        session = self._sessions.get(to)
+        if session is None:
+            session = self._sessions[to] = _Session()
+            session.task = asyncio.create_task(self._keepalive(to, session))
+        session.refs += 1
+
+    async def release(self, to: str, stop: bool = False) -> None:
+        """End one holder's session. Pass stop=True when no message follows to clear the indicator."""
+        session = self._sessions.get(to)
+        if session is None:
+            return
+        session.refs -= 1
+        if session.refs > 0:
+            return
+        del self._sessions[to]
+        session.task.cancel()
+        if stop:
+            TYPING_CALLS.inc(action="stop")
+            await sender.stop_typing(to)
+
+    def refresh(self, to: str) -> None:
+        """Re-show the indicator after a message to `to` cleared it. No-op without a session."""
+        session = self._sessions.get(to)
+        if session is not None:
+            session.wake.set()
+
+    async def _keepalive(self, to: str, session: _Session) -> None:
+        while True:
+            session.wake.clear()
+            TYPING_CALLS.inc(action="start")
+            await sender.start_typing(to)
+            try:
+                await asyncio.wait_for(session.wake.wait(), self._refresh)
+            except asyncio.TimeoutError:
+                pass
+
+
+_sessions: TypingSessions | None = None
+
+
+def get_typing() -> TypingSessions:
+    global _sessions
+    if _sessions is None:
+        _sessions = TypingSessions()
+    return _sessions
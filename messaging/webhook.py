@@ -1,14 +1,23 @@
-import asyncio
+import dataclasses
 import json
 import logging
 import os
-import threading
 
 from flask import Flask, request, jsonify
 
-from messaging import chat_store, sender
-from messaging.events import InboundMessage, StatusEvent, ReactionEvent, TypingEvent, parse_webhook_event
+from canvas import credentials
+from canvas.pool import connect
+from messaging import attachments, chat_store, sender, sms
+from messaging.dedupe import Deduper
+from messaging.delivery import get_tracker, start_inbound
+from messaging.dispatcher import Dispatcher
+from messaging.inbox import Inbox
+from messaging.journal import get_journal
+from messaging.progress import ProgressReporter
+from messaging.typing_sessions import get_typing
+from messaging.events import InboundMessage, StatusEvent, ReactionEvent, TypingEvent, delivery_key, parse_webhook_event
 from messaging.verify import verify_webhook_signature
+from telemetry import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -21,97 +30,223 @@ _agent_handler = None
 def set_agent_handler(handler):
     """Register the async function that processes a message and returns a reply.
 
-    Signature: async (text: str, from_number: str) -> str
+    Signature: async (text: str, from_number: str, progress: ProgressReporter) -> str
+
+    The handler should call progress.tool_started / progress.tool_finished as
+    tools run so slow turns get interim texts.
     """
     global _agent_handler
     _agent_handler = handler
 
 
-@app.route("/webhook", methods=["POST", "GET"])
-def linq_webhook():
-    # GET = health check
-    if request.method == "GET":
-        return "OK", 200
+RETRY_AFTER_SECONDS = int(os.environ.get("WEBHOOK_RETRY_AFTER", "5"))
+
+_dispatcher: Dispatcher | None = None
+_inbox: Inbox | None = None
+_deduper: Deduper | None = None
+
+
+def get_dispatcher() -> Dispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = Dispatcher(process_event)
+    return _dispatcher
+
+
+def get_inbox() -> Inbox:
+    global _inbox
+    if _inbox is None:
+        # Answered messages leave the journal; failed ones stay for the next start
+        _inbox = Inbox(_handle_inbound_message, on_done=lambda batch: get_journal().complete([m.message_id for m in batch]))
+    return _inbox
 
-    raw_body = request.get_data(as_text=True)
 
+def get_deduper() -> Deduper:
+    global _deduper
+    if _deduper is None:
+        _deduper = Deduper()
+    return _deduper
+
+
+def parse_request(raw_body: str, headers) -> tuple[object | None, tuple[dict, int] | None]:
+    """Verify and parse a webhook delivery.
+
+    Returns (event, None) on success (event may be None for ignored types) or
+    (None, (error_body, status)) when the delivery must be rejected.
+    """
     # Verify HMAC signature
     webhook_secret = os.environ.get("LINQ_WEBHOOK_SECRET", "")
     if webhook_secret:
-        signature = request.headers.get("X-Webhook-Signature")
-        timestamp = request.headers.get("X-Webhook-Timestamp")
+        signature = headers.get("X-Webhook-Signature")
+        timestamp = headers.get("X-Webhook-Timestamp")
         valid, reason = verify_webhook_signature(raw_body, signature, timestamp, webhook_secret)
         if not valid:
             logger.warning("Webhook signature rejected: %s", reason)
-            return jsonify({"error": "Unauthorized", "reason": reason}), 401
+            return None, ({"error": "Unauthorized", "reason": reason}, 401)
 
     # Parse payload
     try:
         payload = json.loads(raw_body)
     except json.JSONDecodeError:
-        return jsonify({"error": "Invalid JSON"}), 400
+        return None, ({"error": "Invalid JSON"}, 400)
 
-    # Return 200 immediately — process in background
-    event = parse_webhook_event(payload)
-    if event is not None:
-        thread = threading.Thread(target=_process_event, args=(event,), daemon=True)
-        thread.start()
+    return parse_webhook_event(payload), None
 
-    return jsonify({"status": "ok"}), 200
 
+def admit(event, submit) -> tuple[dict, int, dict]:
+    """Deduplicate and enqueue a parsed event. Returns (body, status, headers) to respond with."""
+    if event is None:
+        return {"status": "ok"}, 200, {}
 
-def _process_event(event):
-    """Background processing of webhook events."""
-    loop = asyncio.new_event_loop()
-    try:
+    key = delivery_key(event)
+    if key and not get_deduper().claim(key):
+        logger.info("Acknowledging duplicate delivery %s", key)
+        return {"status": "duplicate"}, 200, {}
+
+    # Recorded before the ack so a restart can still answer it; Canvas tokens are never written
+    if isinstance(event, InboundMessage):
+        get_journal().record(dataclasses.replace(event, text=credentials.redact(event.text)))
+
+    if not submit(event):
+        if key:
+            get_deduper().release(key)
         if isinstance(event, InboundMessage):
-            loop.run_until_complete(_handle_inbound_message(event))
-        elif isinstance(event, StatusEvent):
-            logger.info("Message %s status: %s", event.message_id, event.status)
-        elif isinstance(event, ReactionEvent):
-            action = "added" if event.added else "removed"
-            logger.info("Reaction %s %s by %s on %s", event.reaction, action, event.from_number, event.message_id)
-        elif isinstance(event, TypingEvent):
-            state = "started" if event.started else "stopped"
-            logger.info("Typing %s by %s", state, event.from_number)
+            get_journal().complete([event.message_id])
+        return {"error": "Busy"}, 503, {"Retry-After": str(RETRY_AFTER_SECONDS)}
+
+    return {"status": "ok"}, 200, {}
+
+
+async def resume_journal() -> None:
+    """Re-queue messages a previous process acknowledged but never answered. Runs on the dispatcher's loop."""
+    pending = get_journal().pending()
+    if not pending:
+        return
+    logger.info("Resuming %d unanswered messages from the journal", len(pending))
+    for msg in pending:
+        # Linq may redeliver these too; only one copy should run
+        key = delivery_key(msg)
+        if key:
+            get_deduper().claim(key)
+        await get_dispatcher().put(msg)
+
+
+@app.route("/webhook", methods=["POST", "GET"])
+def linq_webhook():
+    """Flask compatibility mode: events are handed to the dispatcher's background loop."""
+    # GET = health check
+    if request.method == "GET":
+        return "OK", 200
+
+    event, error = parse_request(request.get_data(as_text=True), request.headers)
+    if error:
+        body, status = error
+        return jsonify(body), status
+
+    # Return 200 immediately — process in background
+    dispatcher = get_dispatcher()
+    if not dispatcher.running:
+        dispatcher.start_in_thread()
+    body, status, headers = admit(event, dispatcher.submit_threadsafe)
+    return jsonify(body), status, headers
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
+async def process_event(event):
+    """Background processing of webhook events (runs on a dispatcher worker)."""
+    if isinstance(event, InboundMessage):
+        # A texted Canvas token is saved here so the logs, the agent and its memory only see a placeholder
+        event = await _save_canvas_token(event)
+        # Downloads run while the burst is debounced and the agent works
+        attachments.prefetch(event.attachments)
+        # Serialized per student; bursts are combined into one turn
+        await get_inbox().put(event)
+    elif isinstance(event, StatusEvent):
+        to = chat_store.get_phone_number(event.chat_id) or "unknown"
+        logger.info("Message %s to %s status: %s", event.message_id, to, event.status)
+        get_tracker().status(event)
+    elif isinstance(event, ReactionEvent):
+        action = "added" if event.added else "removed"
+        by = event.from_number or chat_store.get_phone_number(event.chat_id) or "unknown"
+        logger.info("Reaction %s %s by %s on %s", event.reaction, action, by, event.message_id)
+    elif isinstance(event, TypingEvent):
+        state = "started" if event.started else "stopped"
+        logger.info("Typing %s by %s", state, event.from_number)
+
+
+async def _save_canvas_token(msg: InboundMessage) -> InboundMessage:
+    token = credentials.find_token(msg.text)
+    if token is None:
+        return msg
+    try:
+        result = await connect(msg.from_number, token)
     except Exception:
-        logger.exception("Error processing webhook event")
-    finally:
-        loop.close()
+        logger.exception("Saving Canvas token from %s failed", msg.from_number)
+        result = "It could not be checked with Canvas right now; ask the student to send it again later."
+    return dataclasses.replace(msg, text=credentials.redact(msg.text, f"[Canvas access token received. {result}]"))
 
 
 async def _handle_inbound_message(msg: InboundMessage):
+    """Run the message pipeline as one telemetry turn keyed by the message id."""
+    turn = tracing.start_turn(msg.message_id)
+    start_inbound(msg)
+    try:
+        await _run_pipeline(msg)
+    finally:
+        tracing.finish_turn(turn)
+
+
+async def _run_pipeline(msg: InboundMessage):
     """Full alive-features message handling pipeline."""
     from_number = msg.from_number
 
     # Cache the chat mapping for outbound replies
     chat_store.set_chat_id(from_number, msg.chat_id)
+    # Replies go back over the service the student used (SMS gets segment-aware formatting)
+    sms.remember_service(from_number, msg.service)
 
-    # ALIVE: Send read receipt
-    await sender.mark_read(from_number)
+    # ALIVE: read receipt and tapback in the background so Linq latency never
+    # delays the agent
+    alive = sender.send_alive_signals(from_number, msg.message_id)
 
-    # ALIVE: Acknowledge with a tapback
-    await sender.react_to_message(msg.message_id, "like")
-
-    # ALIVE: Start typing indicator
-    await sender.start_typing(from_number)
-
-    if not msg.text:
-        await sender.stop_typing(from_number)
+    if not msg.text and not msg.attachments:
+        await alive
         return
 
     logger.info("Message from %s via %s: %s", from_number, msg.service, msg.text[:100])
 
+    # Typing indicator stays up for the whole turn; the reply clears it
+    typing = get_typing()
+    progress = ProgressReporter(from_number)
+    typing.acquire(from_number)
+    replying = False
     try:
-        if _agent_handler:
-            reply = await _agent_handler(msg.text, from_number)
-        else:
-            reply = "BuckeyeBot is starting up, please try again in a moment."
+        progress.start()
+        reply = await _agent_reply(msg, progress)
+        await progress.finish()
+        await alive
+        replying = True
+    finally:
+        # If the turn failed no reply will clear the indicator, so stop it explicitly
+        await typing.release(from_number, stop=not replying)
 
-        await sender.stop_typing(from_number)
-        await sender.send_message(from_number, reply)
+    await sender.send_message(from_number, reply)
+    # Only matters if another turn for this student still holds a session
+    typing.refresh(from_number)
 
+
+async def _agent_reply(msg: InboundMessage, progress: ProgressReporter) -> str:
+    if not _agent_handler:
+        return "BuckeyeBot is starting up, please try again in a moment."
+    try:
+        text = msg.text
+        if msg.attachments:
+            text = "\n\n".join(filter(None, [text, await attachments.describe_all(msg.attachments)]))
+        return await _agent_handler(text, msg.from_number, progress)
     except Exception:
-        logger.exception("Agent error processing message from %s", from_number)
-        await sender.stop_typing(from_number)
-        await sender.send_message(from_number, "Sorry, something went wrong. Please try again.")
+        logger.exception("Agent error processing message from %s", msg.from_number)
+        return "Sorry, something went wrong. Please try again."
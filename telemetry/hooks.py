@@ -0,0 +1,45 @@
+"""Span instrumentation for beeai agent runs (LLM calls and tool calls)."""
+
+from beeai_framework.backend import ChatModel
+from beeai_framework.context import Run
+from beeai_framework.emitter import EmitterOptions, EventMeta
+from beeai_framework.tools import Tool
+
+from telemetry import tracing
+
+_NESTED = EmitterOptions(match_nested=True)
+
+
+def _span_kind(creator: object) -> str | None:
+    if isinstance(creator, Tool):
+        return "tool"
+    if isinstance(creator, ChatModel):
+        return "llm"
+    return None
+
+
+def instrument(run: Run) -> Run:
+    """Record a span per LLM and tool call made during an agent run."""
+    open_spans: dict[str, tracing.Span] = {}
+
+    def key(event: EventMeta) -> str:
+        return event.trace.run_id if event.trace else str(id(event.creator))
+
+    def matches(event: EventMeta) -> bool:
+        return event.name in ("start", "success", "error") and _span_kind(event.creator) is not None
+
+    def on_event(data, event: EventMeta) -> None:
+        if event.name == "start":
+            name = event.creator.name if isinstance(event.creator, Tool) else event.creator.model_id
+            open_spans[key(event)] = tracing.begin(_span_kind(event.creator), name)
+            return
+        span = open_spans.pop(key(event), None)
+        if span is None:
+            return
+        usage = getattr(getattr(data, "value", None), "usage", None)
+        if usage is not None:
+            span.tokens_in = usage.prompt_tokens
+            span.tokens_out = usage.completion_tokens
+        tracing.end(span, error=event.name == "error")
+
+    return run.on(matches, on_event, _NESTED)
@@ -0,0 +1,130 @@
+"""Per-turn spans for LLM, tool, HTTP and Linq calls.
+
+A turn is one inbound message. start_turn() binds it to the current context, so
+every span opened by the same task (or tasks it spawns) is attributed to that
+message id. Spans also feed the process-wide histograms in telemetry.metrics.
+"""
+
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+SLOW_TURN_SECONDS = float(os.environ.get("SLOW_TURN_SECONDS", "15"))
+
+SPAN_SECONDS = metrics.histogram(
+    "buckeyebot_span_seconds", "Wall time of instrumented calls", ("kind", "name")
+)
+SPAN_BYTES = metrics.histogram(
+    "buckeyebot_span_bytes", "Response payload size of instrumented calls", ("kind",), metrics.BYTES_BUCKETS
+)
+SPAN_ERRORS = metrics.counter(
+    "buckeyebot_span_errors_total", "Instrumented calls that raised", ("kind", "name")
+)
+LLM_TOKENS = metrics.histogram(
+    "buckeyebot_llm_tokens", "Tokens per LLM call", ("direction",), metrics.TOKEN_BUCKETS
+)
+TURN_SECONDS = metrics.histogram("buckeyebot_turn_seconds", "Wall time per inbound message")
+
+
+@dataclass
+class Span:
+    kind: str  # "agent" | "llm" | "tool" | "http" | "linq" | ...
+    name: str
+    started: float = field(default_factory=time.monotonic)
+    duration: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    bytes: int = 0
+    cache: str = ""  # "hit" | "miss" | "" when the call has no cache
+    error: bool = False
+
+    def describe(self) -> str:
+        parts = [f"{self.kind} {self.name} {self.duration:.2f}s"]
+        if self.tokens_in or self.tokens_out:
+            parts.append(f"tokens={self.tokens_in}/{self.tokens_out}")
+        if self.bytes:
+            parts.append(f"bytes={self.bytes}")
+        if self.cache:
+            parts.append(f"cache={self.cache}")
+        if self.error:
+            parts.append("error")
+        return " ".join(parts)
+
+
+@dataclass
+class Turn:
+    message_id: str
+    started: float = field(default_factory=time.monotonic)
+    spans: list[Span] = field(default_factory=list)
+
+
+_current_turn: ContextVar[Turn | None] = ContextVar("current_turn", default=None)
+
+
+def start_turn(message_id: str) -> Turn:
+    turn = Turn(message_id)
+    _current_turn.set(turn)
+    return turn
+
+
+def current_message_id() -> str:
+    turn = _current_turn.get()
+    return turn.message_id if turn else ""
+
+
+def finish_turn(turn: Turn) -> None:
+    """Record the turn duration and log a span breakdown when it was slow."""
+    elapsed = time.monotonic() - turn.started
+    TURN_SECONDS.observe(elapsed)
+    if elapsed >= SLOW_TURN_SECONDS:
+        breakdown = "\n".join(
+            f"  +{s.started - turn.started:6.2f}s {s.describe()}"
+            for s in sorted(turn.spans, key=lambda s: s.started)
+        )
+        logger.warning("Slow turn %s took %.1fs:\n%s", turn.message_id, elapsed, breakdown)
+
+
+def begin(kind: str, name: str) -> Span:
+    return Span(kind, name)
+
+
+def end(span: Span, error: bool = False) -> None:
+    span.duration = time.monotonic() - span.started
+    span.error = span.error or error
+    SPAN_SECONDS.observe(span.duration, kind=span.kind, name=span.name)
+    if span.bytes:
+        SPAN_BYTES.observe(span.bytes, kind=span.kind)
+    if span.tokens_in:
+        LLM_TOKENS.observe(span.tokens_in, direction="input")
+    if span.tokens_out:
+        LLM_TOKENS.observe(span.tokens_out, direction="output")
+    if span.error:
+        SPAN_ERRORS.inc(kind=span.kind, name=span.name)
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.spans.append(span)
+
+
+@contextmanager
+def span(kind: str, name: str):
+    """Time a block. Attributes (bytes, tokens, cache) can be set on the yielded span."""
+    s = begin(kind, name)
+    try:
+        yield s
+    except BaseException:
+        end(s, error=True)
+        raise
+    end(s)
+
+
+def route_name(path: str) -> str:
+    """Collapse ids in a URL path so span names stay low-cardinality."""
+    return re.sub(r"/(?=[^/]*\d)[^/]{3,}|/\d+", "/{id}", path)
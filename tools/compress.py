@@ -0,0 +1,186 @@
+"""Question-aware compression of large tool results.
+
+format_response() runs every campus tool result through compress() before it
+reaches the agent. Results that fit the token budget pass through untouched.
+Larger ones have their record list scored against the student's question (BM25
+over each record's text, no LLM call); the best records are kept, with long
+fields that don't mention the question dropped, until the budget is full.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from contextvars import ContextVar
+
+TOKEN_BUDGET = int(os.environ.get("TOOL_OUTPUT_TOKEN_BUDGET", "1500"))
+CHARS_PER_TOKEN = 4
+
+# Fields shorter than this are always kept; nested values this small are kept whole
+SHORT_FIELD_CHARS = 80
+SMALL_CONTAINER_CHARS = 300
+
+_STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "at", "can", "do", "does", "for", "from",
+    "get", "have", "how", "i", "in", "is", "it", "me", "my", "near", "of", "on", "or",
+    "show", "the", "there", "to", "today", "what", "whats", "when", "where", "which",
+    "who", "with", "you",
+}
+
+_question: ContextVar[str] = ContextVar("tool_question", default="")
+
+
+def set_question(text: str) -> None:
+    """Record the question being answered so tool results can be focused on it."""
+    _question.set(text)
+
+
+def current_question() -> str:
+    return _question.get()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _terms(text: str) -> list[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words if w not in _STOPWORDS]
+
+
+def _size(value) -> int:
+    return len(json.dumps(value, default=str))
+
+
+def _find_records(data, depth: int = 0) -> list | None:
+    """Return the path (list of keys) to the largest list of dicts in data."""
+    if isinstance(data, list) and data and all(isinstance(d, dict) for d in data):
+        return []
+    if not isinstance(data, dict) or depth >= 3:
+        return None
+    best, best_len = None, 0
+    for key, value in data.items():
+        sub = _find_records(value, depth + 1)
+        if sub is None:
+            continue
+        length = len(_get(value, sub))
+        if length > best_len:
+            best, best_len = [key, *sub], length
+    return best
+
+
+def _get(data, path: list):
+    for key in path:
+        data = data[key]
+    return data
+
+
+def _replace(data, path: list, records: list):
+    if not path:
+        return records
+    return {**data, path[0]: _replace(data[path[0]], path[1:], records)}
+
+
+def _mentions(value, terms: set[str]) -> bool:
+    return bool(terms.intersection(_terms(json.dumps(value, default=str))))
+
+
+def _prune(value, terms: set[str]):
+    """Drop long parts of a record that don't mention any question term."""
+    if isinstance(value, dict):
+        kept = {}
+        for k, v in value.items():
+            if isinstance(v, (dict, list)):
+                if _size(v) <= SMALL_CONTAINER_CHARS:
+                    kept[k] = v
+                elif _mentions(v, terms):
+                    kept[k] = _prune(v, terms)
+            elif len(str(v)) <= SHORT_FIELD_CHARS or _mentions(v, terms) or _mentions(k, terms):
+                kept[k] = v
+        return kept
+    if isinstance(value, list):
+        return [_prune(v, terms) for v in value if _size(v) <= SMALL_CONTAINER_CHARS or _mentions(v, terms)]
+    return value
+
+
+def _strings(value) -> int:
+    if isinstance(value, dict):
+        return sum(_strings(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(_strings(v) for v in value)
+    return 1 if isinstance(value, str) else 0
+
+
+def _truncate(value, budget_chars: int):
+    """Cut long strings in a record so it fits roughly within budget_chars, keeping every field."""
+    cap = max(SHORT_FIELD_CHARS, budget_chars // max(1, _strings(value)))
+
+    def cut(v):
+        if isinstance(v, dict):
+            return {k: cut(x) for k, x in v.items()}
+        if isinstance(v, list):
+            return [cut(x) for x in v]
+        if isinstance(v, str) and len(v) > cap:
+            return v[:cap] + "..."
+        return v
+
+    return cut(value)
+
+
+def _bm25(docs: list[list[str]], query: list[str], k1: float = 1.2, b: float = 0.75) -> list[float]:
+    n = len(docs)
+    avg_len = sum(len(d) for d in docs) / n or 1
+    df = Counter(t for d in docs for t in set(d))
+    scores = []
+    for doc in docs:
+        tf = Counter(doc)
+        score = 0.0
+        for t in query:
+            if t in tf:
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                score += idf * tf[t] * (k1 + 1) / (tf[t] + k1 * (1 - b + b * len(doc) / avg_len))
+        scores.append(score)
+    return scores
+
+
+def compress(data, question: str | None = None, budget: int = TOKEN_BUDGET) -> tuple[object, str | None]:
+    """Shrink data to fit the token budget, keeping the records most relevant to the question.
+
+    Returns (data, note); note is None when nothing was dropped.
+    """
+    if estimate_tokens(json.dumps(data, default=str)) <= budget:
+        return data, None
+    path = _find_records(data)
+    if path is None:
+        return data, None
+
+    records = _get(data, path)
+    query = _terms(question if question is not None else _question.get())
+    terms = set(query)
+    scores = _bm25([_terms(json.dumps(r, default=str)) for r in records], query) if query else [0.0] * len(records)
+    relevant = any(scores)
+    ranked = sorted(range(len(records)), key=lambda i: -scores[i])
+    if relevant:
+        ranked = [i for i in ranked if scores[i] > 0]
+
+    budget_chars = budget * CHARS_PER_TOKEN - _size(_replace(data, path, []))
+    chosen, used = [], 0
+    for i in ranked:
+        # Fields are only dropped for not mentioning the question when some record did mention it
+        record = _prune(records[i], terms) if relevant else records[i]
+        size = _size(record) + 2
+        if used + size > budget_chars:
+            if chosen:
+                break
+            record = _truncate(record, budget_chars)
+            size = _size(record) + 2
+        chosen.append((i, record))
+        used += size
+    # Keep the source order so listings (e.g. by time) still read naturally
+    kept = [r for _, r in sorted(chosen, key=lambda c: c[0])]
+    if relevant:
+        note = f"showing {len(kept)} of {len(records)} records most relevant to the question"
+    else:
+        note = f"showing the first {len(kept)} of {len(records)} records"
+    return _replace(data, path, kept), note
@@ -0,0 +1,14 @@
+"""Per-turn context for tools: the student the agent is acting for."""
+
+from contextvars import ContextVar
+
+_student: ContextVar[str] = ContextVar("tool_student", default="")
+
+
+def set_student(phone_number: str) -> None:
+    """Bind the student's phone number to the current turn; tools spawned from it inherit it."""
+    _student.set(phone_number)
+
+
+def current_student() -> str:
+    return _student.get()
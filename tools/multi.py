@@ -0,0 +1,75 @@
+import asyncio
+import json
+import logging
+
+from beeai_framework.tools import AnyTool, StringToolOutput, tool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 20.0
+MAX_LOOKUPS = 6
+
+# Browser and emulator automation is slow; give it room but keep the turn bounded
+TOOL_TIMEOUTS = {
+    "get_class_schedule": 90.0,
+    "get_grades": 90.0,
+    "get_financial_aid_status": 90.0,
+    "get_holds_and_todos": 90.0,
+    "get_enrollment_info": 90.0,
+    "get_buckeyelink_dashboard": 90.0,
+    "search_grubhub_restaurants": 120.0,
+    "get_restaurant_menu": 120.0,
+    "get_upcoming_assignments": 45.0,
+}
+
+# Tools with side effects never run through multi_lookup
+EXCLUDED_TOOLS = {"place_grubhub_order", "enable_deadline_reminders", "disable_deadline_reminders"}
+
+
+async def _invoke(t: AnyTool, args: dict) -> str:
+    output = await t.run(args)
+    return output.get_text_content()
+
+
+async def _run_lookup(registry: dict[str, AnyTool], call: dict) -> str:
+    name = str(call.get("tool", ""))
+    args = call.get("args") or {}
+    t = registry.get(name)
+    if t is None:
+        return f"### {name}\nUnknown or unsupported tool."
+    timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TIMEOUT)
+    try:
+        text = await asyncio.wait_for(_invoke(t, args), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("multi_lookup: %s timed out after %.0fs", name, timeout)
+        text = f"Timed out after {timeout:.0f}s."
+    except Exception as e:
+        logger.warning("multi_lookup: %s failed: %s", name, e)
+        text = f"Failed: {type(e).__name__}."
+    return f"### {name}\n{text}"
+
+
+def make_multi_lookup(tools: list[AnyTool]) -> AnyTool:
+    """Build the multi_lookup tool over the given read-only tools."""
+    registry = {t.name: t for t in tools if t.name not in EXCLUDED_TOOLS}
+
+    @tool
+    async def multi_lookup(lookups: str) -> StringToolOutput:
+        """Run several independent lookups at the same time and return all of their results. Use this when a question needs more than one tool, e.g. dining hours and parking near the Union.
+
+        Args:
+            lookups: JSON list of tool calls, e.g. [{"tool": "get_parking_availability"}, {"tool": "search_buildings", "args": {"query": "union"}}]
+        """
+        try:
+            calls = json.loads(lookups)
+        except json.JSONDecodeError:
+            return StringToolOutput("lookups must be a JSON list of {\"tool\": ..., \"args\": {...}} objects.")
+        if not isinstance(calls, list) or not all(isinstance(c, dict) for c in calls):
+            return StringToolOutput("lookups must be a JSON list of {\"tool\": ..., \"args\": {...}} objects.")
+        if len(calls) > MAX_LOOKUPS:
+            return StringToolOutput(f"At most {MAX_LOOKUPS} lookups can run at once.")
+
+        results = await asyncio.gather(*(_run_lookup(registry, c) for c in calls))
+        return StringToolOutput("\n\n".join(results))
+
+    return multi_lookup
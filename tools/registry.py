@@ -0,0 +1,224 @@
+"""Deferred tool registration.
+
+Tool metadata (name, description, input schema) is read from each tool
+module's source with ast, so the agent can advertise every tool at startup
+without importing Playwright or Appium. A module is imported the
+first time one of its tools runs, in a worker thread so the slow import
+never stalls the shared event loop.
+
+    python -m tools.registry    # print a startup-time profile
+"""
+
+import ast
+import asyncio
+import importlib
+import importlib.util
+import inspect
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from beeai_framework.context import RunContext
+from beeai_framework.emitter import Emitter
+from beeai_framework.tools import AnyTool, Tool, ToolOutput, ToolRunOptions
+from beeai_framework.utils.strings import to_safe_word
+from pydantic import BaseModel, ConfigDict, Field, create_model
+
+logger = logging.getLogger(__name__)
+
+# Tool modules in the order their tools are offered to the agent
+TOOL_MODULES = [
+    "tools.dining",
+    "tools.bus",
+    "tools.parking",
+    "tools.events",
+    "tools.classes",
+    "tools.library",
+    "tools.recsports",
+    "tools.buildings",
+    "tools.calendar",
+    "tools.directory",
+    "tools.athletics",
+    "tools.merchants",
+    "tools.foodtrucks",
+    "tools.studentorgs",
+    "canvas.tools",
+    "grubhub.tools",
+    "buckeyelink.tools",
+]
+
+_TYPES = {"str": str, "int": int, "float": float, "bool": bool}
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    module: str
+    description: str
+    # (parameter name, annotation source, default or ... when required)
+    params: list[tuple[str, str, Any]] = field(default_factory=list)
+    # parameter name -> description from the docstring's Args: section
+    arg_docs: dict[str, str] = field(default_factory=dict)
+
+    def input_schema(self) -> type[BaseModel]:
+        fields = {
+            p: (_TYPES.get(ann, Any), Field(default, description=self.arg_docs.get(p)))
+            for p, ann, default in self.params
+        }
+        return create_model(self.name, __config__=ConfigDict(extra="ignore", arbitrary_types_allowed=True), **fields)
+
+
+def _is_tool_decorator(node: ast.expr) -> bool:
+    target = node.func if isinstance(node, ast.Call) else node
+    return isinstance(target, ast.Name) and target.id == "tool"
+
+
+def _split_docstring(docstring: str) -> tuple[str, dict[str, str]]:
+    """Separate a Google-style Args: section from the rest of the docstring."""
+    lines = docstring.splitlines()
+    start = next((i for i, line in enumerate(lines) if line.strip() == "Args:"), None)
+    if start is None:
+        return docstring, {}
+    args: dict[str, str] = {}
+    end = len(lines)
+    current = None
+    indent = None
+    for i in range(start + 1, len(lines)):
+        line = lines[i]
+        if not line.strip():
+            current = None
+            continue
+        width = len(line) - len(line.lstrip())
+        if width == 0:
+            end = i  # the section ends at the next unindented line
+            break
+        indent = width if indent is None else indent
+        name, sep, text = line.strip().partition(":")
+        if width == indent and sep:
+            current = name.split(" ")[0]
+            args[current] = text.strip()
+        elif current is not None:
+            args[current] = f"{args[current]} {line.strip()}"
+    rest = "\n".join(lines[:start] + lines[end:]).strip()
+    return rest, args
+
+
+def _parse_module(module: str) -> list[ToolSpec]:
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None:
+        raise ImportError(f"Tool module {module} not found")
+    with open(spec.origin) as f:
+        tree = ast.parse(f.read(), filename=spec.origin)
+
+    specs = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if not any(_is_tool_decorator(d) for d in node.decorator_list):
+            continue
+        args = node.args.args
+        defaults = [...] * (len(args) - len(node.args.defaults)) + [
+            ast.literal_eval(d) for d in node.args.defaults
+        ]
+        params = [
+            (a.arg, ast.unparse(a.annotation) if a.annotation else "", default)
+            for a, default in zip(args, defaults)
+        ]
+        description, arg_docs = _split_docstring(ast.get_docstring(node) or "")
+        specs.append(ToolSpec(node.name, module, description, params, arg_docs))
+    return specs
+
+
+@lru_cache(maxsize=1)
+def manifest() -> list[ToolSpec]:
+    """Metadata for every tool, built from source without importing tool modules."""
+    return [spec for module in TOOL_MODULES for spec in _parse_module(module)]
+
+
+class LazyTool(Tool):
+    """Advertises a tool from its manifest entry and imports the real one on first run."""
+
+    def __init__(self, spec: ToolSpec):
+        super().__init__()
+        self.spec = spec
+        self._schema = spec.input_schema()
+        self._target: AnyTool | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.spec.name
+
+    @property
+    def description(self) -> str:
+        return self.spec.description
+
+    @property
+    def input_schema(self) -> type[BaseModel]:
+        return self._schema
+
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(namespace=["tool", "custom", to_safe_word(self.name)], creator=self)
+
+    def _resolve(self) -> AnyTool:
+        with self._lock:
+            if self._target is None:
+                started = time.perf_counter()
+                module = importlib.import_module(self.spec.module)
+                self._target = getattr(module, self.spec.name)
+                logger.info(
+                    "Loaded tool %s from %s in %.0fms",
+                    self.name, self.spec.module, (time.perf_counter() - started) * 1000,
+                )
+            return self._target
+
+    async def _run(self, input: BaseModel, options: ToolRunOptions | None, context: RunContext) -> ToolOutput:
+        target = self._target or await asyncio.to_thread(self._resolve)
+        # Call the real implementation directly so events fire once, on this tool
+        return await target._run(target.input_schema.model_validate(input.model_dump()), options, context)
+
+    async def clone(self) -> "LazyTool":
+        cloned = LazyTool(self.spec)
+        cloned._target = self._target
+        cloned.middlewares.extend(self.middlewares)
+        return cloned
+
+
+def load_tools() -> list[AnyTool]:
+    return [LazyTool(spec) for spec in manifest()]
+
+
+def _profile() -> None:
+    """Print how long the manifest takes versus importing each tool module."""
+    started = time.perf_counter()
+    specs = manifest()
+    manifest_ms = (time.perf_counter() - started) * 1000
+    print(f"manifest: {len(specs)} tools from {len(TOOL_MODULES)} modules in {manifest_ms:.1f}ms")
+
+    total = 0.0
+    for module in TOOL_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+            status = ""
+        except ImportError as e:
+            status = f"  ({e})"
+        elapsed = (time.perf_counter() - started) * 1000
+        total += elapsed
+        print(f"{module:<24} {elapsed:8.1f}ms{status}")
+    print(f"eager import of all tool modules: {total:.1f}ms; deferred startup: {manifest_ms:.1f}ms")
+
+    # Make sure the manifest still agrees with what the decorators produce
+    for spec in specs:
+        module = sys.modules.get(spec.module)
+        real = getattr(module, spec.name, None) if module else None
+        if real is not None and inspect.cleandoc(real.description) != spec.description:
+            print(f"warning: manifest description differs for {spec.name}")
+
+
+if __name__ == "__main__":
+    _profile()
@@ -1,9 +1,13 @@
 import json
 from datetime import datetime, timezone
+from urllib.parse import urlsplit
 from zoneinfo import ZoneInfo
 
 import httpx
 
+from telemetry import tracing
+from tools.compress import compress
+
 EASTERN = ZoneInfo("America/New_York")
 
 _client: httpx.AsyncClient | None = None
@@ -18,8 +22,10 @@ async def get_client() -> httpx.AsyncClient:
 
 async def fetch_json(url: str) -> dict | list:
     client = await get_client()
-    resp = await client.get(url)
-    resp.raise_for_status()
+    with tracing.span("http", tracing.route_name(urlsplit(url).path)) as span:
+        resp = await client.get(url)
+        span.bytes = len(resp.content)
+        resp.raise_for_status()
     return resp.json()
 
 
@@ -47,6 +53,10 @@ def now_eastern() -> str:
 
 def format_response(data: dict | list, label: str = "Results") -> str:
     timestamp = now_eastern()
+    # Keep only what the current question needs before it enters agent memory
+    data, note = compress(data)
+    if note:
+        label = f"{label} ({note})"
     text = json.dumps(data, indent=2, default=str)
     # Truncate very long responses for SMS friendliness
     if len(text) > 8000: